@@ -0,0 +1,273 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+# 合成数据词表：贴近 build_unified_rules 实际产出的关键词/正则组合
+ITEMS_CN = ["身份证号", "手机号", "姓名", "地址", "银行卡号", "车牌号", "驾驶证号", "护照号", "邮箱", "出生日期",
+            "线路编号", "站点名称", "金额", "性别", "工号", "单位名称", "统一社会信用代码", "设备编号"]
+WORDS_EN = ["id", "card", "phone", "mobile", "name", "addr", "address", "bank", "acct", "plate", "license",
+            "passport", "email", "birth", "date", "route", "station", "amount", "gender", "emp", "org", "code",
+            "credit", "device", "no", "num", "user", "status", "type", "time", "create", "update", "cust", "owner"]
+REGEXES = [
+    r"^1[3-9]\d{9}$",
+    r"^\d{17}[\dXx]$",
+    r"^[\w.+-]+@[\w-]+\.[\w.]+$",
+    r"^\d{4}-\d{2}-\d{2}$",
+    r"^[京津沪渝冀豫云辽黑湘皖鲁新苏浙赣鄂桂甘晋蒙陕吉闽贵粤青藏川宁琼][A-Z][A-Z0-9]{5}$",
+    r"^\d{16,19}$",
+    r"^[A-Z]\d{8}$",
+    r"^[0-9A-Z]{18}$",
+    r"^\d+(\.\d{1,2})?$",
+    r"^(男|女)$",
+]
+SAMPLES = ["13812345678", "110101199003071234", "a.b@example.com", "2020-01-01", "粤A12345",
+           "6222020200112233445", "E12345678", "91350100M000100Y43", "128.50", "男", "abc", "", None]
+
+
+def synth_combined(n_items: int, rng: random.Random) -> List[Dict[str, Any]]:
+    rows = []
+    for i in range(n_items):
+        cn = rng.choice(ITEMS_CN)
+        en = rng.sample(WORDS_EN, rng.randint(2, 4))
+        rx = [rng.choice(REGEXES)]
+        if rng.random() < 0.3:
+            # 少量变体正则，模拟 LLM 生成的近似写法
+            rx.append(rx[0][:-1] + r"\s*$")
+        rows.append({
+            "FieldName": f"item{i}_{cn}",
+            "Category": f"c{i % 7}/s{i % 11}/{cn}",
+            "Level": f"s{rng.randint(1, 4)}",
+            "PatternKeywords": ",".join([cn, cn[:2]] + en),
+            "PatternRegex": "||".join(rx),
+            "Citation": "",
+            "Source": "bench",
+            "Priority": 50,
+        })
+    return rows
+
+
+def synth_rules(n_rules: int, seed: int) -> List[Dict]:
+    from layer3_business_rules_builder import build_unified_rules
+
+    rng = random.Random(seed)
+    # 先估算每个数据项产生的规则数，再按目标规则数生成
+    probe = build_unified_rules(synth_combined(50, random.Random(seed)))
+    per_item = max(1, len(probe) // 50)
+    return build_unified_rules(synth_combined(max(1, n_rules // per_item), rng))
+
+
+def synth_rows(n_rows: int, seed: int) -> List[List[Any]]:
+    rng = random.Random(seed)
+    # 真实数据字典中大量列组合重复出现（id/create_time/phone 等）
+    pool = []
+    for _ in range(max(1, n_rows // 20)):
+        words = rng.sample(WORDS_EN, rng.randint(1, 3))
+        pool.append(("_".join(words), rng.choice(ITEMS_CN) + rng.choice(["", "信息", "编码"]), rng.choice(SAMPLES)))
+    rows = []
+    for i in range(n_rows):
+        field, comment, sample = rng.choice(pool)
+        rows.append([f"t_{rng.choice(WORDS_EN)}_{i % 300}", field, comment, sample])
+    return rows
+
+
+def write_workbook(path: str, rows: List[List[Any]]):
+    from layer4_io import open_writer
+
+    writer = open_writer(path, "", "Sheet1", streaming=True)
+    writer.append(["表名", "字段名", "字段注释", "字段样本"])
+    for r in rows:
+        writer.append(r)
+    writer.close()
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位 KB，macOS 单位字节
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_phases(domain: str, in_path: str, out_path: str) -> Dict[str, Any]:
+    """compiled 引擎的分阶段计时：load / read / featurize / score / decide / write。"""
+    from layer4_classifier import build_row_obj, detect_columns, load_ruleset, output_headers, output_row
+    from layer4_classifier import rules_max_depth, summarize_row
+    from layer4_io import open_reader, open_writer
+    from rules.engine import CompiledRules, _Row
+
+    phases = {}
+    t = time.perf_counter()
+    rules, matchers = load_ruleset(domain, ROOT)
+    engine = CompiledRules(rules, matchers)
+    phases["load"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    reader = open_reader(in_path, "", "", read_only=True)
+    raw = list(reader.rows())
+    cols = detect_columns(reader.headers)
+    reader.close()
+    phases["read"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    ctx = []
+    for r in raw:
+        row = _Row(build_row_obj(r, cols, reader.title), engine.matchers)
+        for key in engine.matchers:
+            row.found(key)
+        ctx.append(row)
+    phases["featurize"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    for row in ctx:
+        engine._run_score(row)
+    phases["score"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    for row in ctx:
+        engine._run_decision(row)
+    phases["decide"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    depth = rules_max_depth(rules)
+    writer = open_writer(out_path, "", reader.title, streaming=True)
+    writer.append(output_headers(reader.headers, depth))
+    for r, row in zip(raw, ctx):
+        writer.append(output_row(summarize_row(r, row.obj), depth))
+    writer.close()
+    phases["write"] = time.perf_counter() - t
+    return {k: round(v, 4) for k, v in phases.items()}
+
+
+def run_child(case: Dict[str, Any]) -> Dict[str, Any]:
+    import contextlib
+    import io
+
+    from layer4_classifier import classify_rows
+
+    out_path = os.path.join(case["tmp"], f"out.{case['engine']}{os.path.splitext(case['input'])[1]}")
+    # classify_rows / tqdm 的进度输出不计入结果
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        t = time.perf_counter()
+        if case["engine"] == "phases":
+            phases = run_phases(case["domain"], case["input"], out_path)
+        else:
+            phases = None
+            classify_rows(
+                case["domain"], case["input"], out_path, False, "", case["engine"], case["cache_size"],
+                case["streaming"], case["workers"],
+            )
+        seconds = time.perf_counter() - t
+    result = {
+        "rules": case["n_rules"],
+        "rows": case["n_rows"],
+        "engine": case["engine"],
+        "workers": case["workers"],
+        "streaming": case["streaming"],
+        "cache_size": case["cache_size"],
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(case["n_rows"] / seconds, 1) if seconds > 0 else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    if phases is not None:
+        result["phases"] = phases
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="layer4 离线基准：合成规则集与数据字典，输出 JSON 报告")
+    parser.add_argument("--rules", default="1000,10000", help="comma separated target rule counts")
+    parser.add_argument("--rows", default="10000", help="comma separated row counts")
+    parser.add_argument("--engines", default="phases,compiled,business_rules", help="engines; 'phases' = compiled with per-phase timings")
+    parser.add_argument("--format", dest="fmt", default="xlsx", choices=["xlsx", "csv", "jsonl", "parquet"])
+    parser.add_argument("--cache-size", dest="cache_size", type=int, default=65536)
+    parser.add_argument("--streaming", default="true")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--max-interpreted-work", dest="max_interp", type=int, default=5000,
+                        help="skip business_rules when rows x (rules / 1000) exceeds this")
+    parser.add_argument("--out", default="", help="write JSON report to this path (default stdout)")
+    parser.add_argument("--child", default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        with open(args.child, "r", encoding="utf-8") as f:
+            case = json.load(f)
+        res = run_child(case)
+        with open(args.child, "w", encoding="utf-8") as f:
+            json.dump(res, f)
+        return
+
+    from rules.bundle import write_bundle
+
+    streaming = str(args.streaming).lower() != "false"
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+            "format": args.fmt,
+        },
+        "cases": [],
+    }
+    tmp = tempfile.mkdtemp(prefix="bench_layer4_")
+    created = []
+    try:
+        for n_rules in [int(x) for x in args.rules.split(",") if x.strip()]:
+            domain = f"_bench_{n_rules}_{args.seed}"
+            rules_dir = os.path.join(ROOT, "rules", domain)
+            os.makedirs(rules_dir, exist_ok=True)
+            created.append(rules_dir)
+            rules = synth_rules(n_rules, args.seed)
+            with open(os.path.join(rules_dir, "unified_rules.json"), "w", encoding="utf-8") as f:
+                json.dump(rules, f, ensure_ascii=False, indent=2)
+            write_bundle(rules_dir, rules)
+
+            for n_rows in [int(x) for x in args.rows.split(",") if x.strip()]:
+                in_path = os.path.join(tmp, f"in_{n_rows}.{args.fmt}")
+                if not os.path.exists(in_path):
+                    write_workbook(in_path, synth_rows(n_rows, args.seed))
+                for engine in engines:
+                    if engine == "business_rules" and n_rows * max(1, len(rules) // 1000) > args.max_interp:
+                        continue
+                    case_path = os.path.join(tmp, "case.json")
+                    with open(case_path, "w", encoding="utf-8") as f:
+                        json.dump({
+                            "domain": domain, "input": in_path, "tmp": tmp, "engine": engine,
+                            "n_rules": len(rules), "n_rows": n_rows, "cache_size": args.cache_size,
+                            "streaming": streaming, "workers": args.workers,
+                        }, f)
+                    # 每个用例单独起进程，峰值 RSS 互不干扰
+                    subprocess.run([sys.executable, os.path.abspath(__file__), "--child", case_path], check=True)
+                    with open(case_path, "r", encoding="utf-8") as f:
+                        res = json.load(f)
+                    report["cases"].append(res)
+                    print(f"[BENCH] {json.dumps(res, ensure_ascii=False)}", file=sys.stderr)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+        for d in created:
+            shutil.rmtree(d, ignore_errors=True)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(args.out)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
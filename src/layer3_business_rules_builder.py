@@ -3,8 +3,10 @@ import os
 from typing import Dict, List, Any
 from business_rules import export_rule_data
 
-from rules.variables import ClassificationVariables
+from rules.variables import ITEM_SCORE_PREFIX, ClassificationVariables
 from rules.actions import ClassificationActions
+from rules.bundle import write_bundle
+from rules.regex_safety import regex_risks, rewrite_regex
 
 
 def read_json(path: str) -> Any:
@@ -26,6 +28,29 @@ def _norm(s: Any) -> str:
     return str(s).strip().lower()
 
 
+# 已提示过回溯风险的正则，每个只提示一次
+_warned_regex: set = set()
+
+
+def split_regexes(raw: Any) -> List[str]:
+    """拆分 || 分隔的正则，把可等价改写的嵌套量词改写为单层重复；仍有灾难性回溯风险的正则
+    照常保留（执行时由 layer4 限时匹配），仅提示一次。"""
+    out = []
+    for rx in (_norm(raw) or "").split("||"):
+        if not rx:
+            continue
+        safe = rewrite_regex(rx)
+        risks = regex_risks(safe)
+        if (safe != rx or risks) and rx not in _warned_regex:
+            _warned_regex.add(rx)
+            if safe != rx:
+                print(f"[INFO] Rewrote nested quantifier: {rx} -> {safe}")
+            if risks:
+                print(f"[WARN] Backtracking-prone regex ({', '.join(risks)}), matched with a time limit: {safe}")
+        out.append(safe)
+    return out
+
+
 def _level_rank(level: str) -> int:
     m = {"s1": 1, "s2": 2, "s3": 3, "s4": 4}
     return m.get(_norm(level).lower(), 0)
@@ -143,7 +168,7 @@ def build_classification_rules(combined: List[Dict]) -> List[Dict]:
             for kw in (_norm(r.get("PatternKeywords")) or "").split(",")
             if kw
         ]
-        rxs = [rx for rx in (_norm(r.get("PatternRegex")) or "").split("||") if rx]
+        rxs = split_regexes(r.get("PatternRegex"))
 
         if not level:
             continue
@@ -210,10 +235,12 @@ def build_unified_rules(combined: List[Dict]) -> List[Dict]:
                 kw_cn.append(x.lower())
 
         # 正则集合
-        rx = [x for x in (_norm(r.get("PatternRegex")) or "").split("||") if x]
+        rx = split_regexes(r.get("PatternRegex"))
 
         rid_base = f"U-{field[:8]}-{level}"
         item_tag = f"T-{field[:8]}-{level}"
+        # 分数按数据项累计，决策规则只看本数据项的分数
+        item_score_var = f"{ITEM_SCORE_PREFIX}{item_tag}"
         generic_en = {
             "id", "no", "num", "code",
             "name", "nm", "first", "last", "username", "user",
@@ -232,7 +259,7 @@ def build_unified_rules(combined: List[Dict]) -> List[Dict]:
                     {"name": "field_tokens", "operator": "contains", "value": kw},
                 ]},
                 "actions": [
-                    {"name": "add_score", "params": {"value": val}},
+                    {"name": "add_item_score", "params": {"item": item_tag, "value": val}},
                     {"name": "add_hit", "params": {"tag": item_tag}},
                     {"name": "add_hit", "params": {"tag": tag_type}},
                 ],
@@ -247,7 +274,7 @@ def build_unified_rules(combined: List[Dict]) -> List[Dict]:
                     {"name": "field_name", "operator": "contains", "value": kw},
                 ]},
                 "actions": [
-                    {"name": "add_score", "params": {"value": val}},
+                    {"name": "add_item_score", "params": {"item": item_tag, "value": val}},
                     {"name": "add_hit", "params": {"tag": item_tag}},
                     {"name": "add_hit", "params": {"tag": tag_type}},
                 ],
@@ -260,7 +287,7 @@ def build_unified_rules(combined: List[Dict]) -> List[Dict]:
                     {"name": "field_comment", "operator": "contains", "value": kw},
                 ]},
                 "actions": [
-                    {"name": "add_score", "params": {"value": 1.5}},
+                    {"name": "add_item_score", "params": {"item": item_tag, "value": 1.5}},
                     {"name": "add_hit", "params": {"tag": item_tag}},
                     {"name": "add_hit", "params": {"tag": "KW_CN"}},
                 ],
@@ -273,7 +300,7 @@ def build_unified_rules(combined: List[Dict]) -> List[Dict]:
                     {"name": "value_text", "operator": "contains", "value": kw},
                 ]},
                 "actions": [
-                    {"name": "add_score", "params": {"value": 1.0}},
+                    {"name": "add_item_score", "params": {"item": item_tag, "value": 1.0}},
                     {"name": "add_hit", "params": {"tag": item_tag}},
                     {"name": "add_hit", "params": {"tag": "VAL_KW"}},
                 ],
@@ -291,16 +318,16 @@ def build_unified_rules(combined: List[Dict]) -> List[Dict]:
                     {"name": "value_text", "operator": "matches_regex", "value": rxp},
                 ]},
                 "actions": [
-                    {"name": "add_score", "params": {"value": 2.0}},
+                    {"name": "add_item_score", "params": {"item": item_tag, "value": 2.0}},
                     {"name": "add_hit", "params": {"tag": item_tag}},
                     {"name": "add_hit", "params": {"tag": "VAL_RX"}},
                 ],
             })
 
-        # 决策规则：高可信 ≥2.0 → 写入分类与分级
+        # 决策规则：高可信 本数据项分数 ≥2.0 → 写入分类与分级
         rules.append({
             "conditions": {"all": [
-                {"name": "score", "operator": "greater_than_or_equal_to", "value": 2.0},
+                {"name": item_score_var, "operator": "greater_than_or_equal_to", "value": 2.0},
                 {"any": [
                     {"name": "hit_tags", "operator": "contains", "value": item_tag},
                 ]},
@@ -316,11 +343,11 @@ def build_unified_rules(combined: List[Dict]) -> List[Dict]:
             ],
         })
 
-        # 决策规则：中可信 1.0 ≤ score < 2.0 → 写入分类与分级
+        # 决策规则：中可信 1.0 ≤ 本数据项分数 < 2.0 → 写入分类与分级
         rules.append({
             "conditions": {"all": [
-                {"name": "score", "operator": "greater_than_or_equal_to", "value": 1.0},
-                {"name": "score", "operator": "less_than", "value": 2.0},
+                {"name": item_score_var, "operator": "greater_than_or_equal_to", "value": 1.0},
+                {"name": item_score_var, "operator": "less_than", "value": 2.0},
                 {"any": [
                     {"name": "hit_tags", "operator": "contains", "value": item_tag},
                 ]},
@@ -351,6 +378,9 @@ def write_unified_rules(domain: str, root: str, unified_rules: List[Dict]):
     with open(uni_path, "w", encoding="utf-8") as f:
         json.dump(unified_rules, f, ensure_ascii=False, indent=2)
 
+    # 预编译规则包：记录 JSON 摘要，Layer 4 直接加载，JSON 变更后自动失效
+    write_bundle(out_dir, unified_rules)
+
     data = export_rule_data(ClassificationVariables, ClassificationActions)
     with open(os.path.join(out_dir, "export_rule_data.json"), "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
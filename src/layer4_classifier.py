@@ -1,16 +1,28 @@
 import os
 import sys
+import re
 import json
 import argparse
-from typing import Dict, List, Any
-import openpyxl
+from collections import deque
+from multiprocessing import Pool
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 from tqdm import tqdm
 
 # 添加项目根目录到路径
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from business_rules.engine import run_all
-from rules.variables import ClassificationVariables
-from rules.actions import ClassificationActions
+from rules.engine import CompiledRules, build_engine, is_valid_rule, iter_leaves, ENGINES
+from rules.memo import MemoizedRules
+from rules.bundle import load_bundle
+from rules.profile import ProfiledRules
+from rules.incremental import FingerprintLog, PreviousResults, load_previous, row_fingerprint, ruleset_digest
+from rules.result_cache import ResultCache
+from rules.multi import MultiDomainRules
+from rules.shadow import CANDIDATE, CURRENT, ShadowDiff, load_candidate
+from rules.sampling import ColumnSample, ColumnSampler
+from rules.regex_safety import DEFAULT_MATCH_TIMEOUT, get_match_timeout, set_match_timeout, timeout_log
+from rules.regex_backend import DEFAULT_REGEX_BACKEND, REGEX_BACKENDS, get_regex_backend, set_regex_backend
+from rules.regex_index import check_patterns
+from layer4_io import FORMAT_EXTENSIONS, READERS, WRITERS, detect_format, format_extension, open_reader, open_writer
 
 
 def load_rules(domain: str, root: str) -> List[Dict]:
@@ -23,6 +35,17 @@ def load_rules(domain: str, root: str) -> List[Dict]:
     return rules
 
 
+def load_ruleset(domain: str, root: str):
+    """优先加载预编译规则包，过期或缺失时回退到 unified_rules.json；返回 (有效规则, 预构建匹配器或 None)。
+    规则包中的匹配器按 re 后端构建，其他正则后端下由调用方重建。"""
+    bundle = load_bundle(os.path.join(root, "rules", domain))
+    if bundle is not None:
+        print(f"[INFO] Loaded rules bundle: count={len(bundle['rules'])}")
+        return bundle["rules"], bundle["matchers"] if get_regex_backend() == "re" else None
+    rules = load_rules(domain, root)
+    return [r for r in rules if is_valid_rule(r)], None
+
+
 def detect_columns(headers: List[str]) -> Dict[str, int]:
     hmap = {str(h or "").strip(): i for i, h in enumerate(headers)}
 
@@ -36,7 +59,65 @@ def detect_columns(headers: List[str]) -> Dict[str, int]:
     field_cn_idx = find(["字段注释", "中文字段名", "中文名称", "字段中文名"]) 
     value_idx = find(["字段样本", "样本", "数据示例"])  
     table_idx = find(["表名", "Table", "表名称"])  
-    return {"field_en": field_en_idx, "field_cn": field_cn_idx, "value": value_idx, "table": table_idx}
+    # 声明类型与最大长度：仅用于跳过样本值上不可能命中的正则，不影响分类结果
+    type_idx = find(["字段类型", "数据类型", "数据类型datatype", "类型", "DataType", "datatype"])
+    length_idx = find(["最大长度", "长度", "Length", "length"])
+    return {
+        "field_en": field_en_idx, "field_cn": field_cn_idx, "value": value_idx, "table": table_idx,
+        "datatype": type_idx, "length": length_idx,
+    }
+
+
+def make_tokens(s: str) -> str:
+    parts = [p for p in re.split(r"[^A-Za-z]+|_+", (s or "").lower()) if p]
+    return " ".join(parts)
+
+
+def build_row_obj(r: List[Any], cols: Dict[str, int], default_table: str) -> Dict[str, Any]:
+    field_en = str((r[cols["field_en"]] if cols.get("field_en", -1) >= 0 else "") or "").strip()
+    field_cn = str((r[cols["field_cn"]] if cols.get("field_cn", -1) >= 0 else "") or "").strip()
+    field_name = field_en
+    field_comment = field_cn or field_en
+    table_name = (
+        str(r[cols["table"]]) if cols.get("table", -1) >= 0 and r[cols["table"]] is not None else default_table
+    )
+    category = ""
+    value_text = str(r[cols["value"]]) if cols["value"] >= 0 and r[cols["value"]] is not None else ""
+    data_type = str((r[cols["datatype"]] if cols.get("datatype", -1) >= 0 else "") or "").strip()
+    data_length = str((r[cols["length"]] if cols.get("length", -1) >= 0 else "") or "").strip()
+
+    return {
+        "field_name": field_name,
+        "field_comment": field_comment,
+        "table_name": table_name,
+        "field_tokens": make_tokens(field_name),
+        "table_tokens": make_tokens(table_name),
+        "category_path": category,
+        "value_text": value_text,
+        "data_type": data_type,
+        "data_length": data_length,
+        "score": 0,
+    }
+
+
+def build_record_obj(rec: Dict[str, Any], default_table: str = "") -> Dict[str, Any]:
+    """由 JSON 记录（field_name/field_comment/table_name/value_text，可选 data_type/data_length）构造与表格行一致的规则输入。"""
+    field_name = str(rec.get("field_name") or "").strip()
+    field_comment = str(rec.get("field_comment") or "").strip() or field_name
+    table_name = str(rec["table_name"]) if rec.get("table_name") is not None else default_table
+    value_text = str(rec["value_text"]) if rec.get("value_text") is not None else ""
+    return {
+        "field_name": field_name,
+        "field_comment": field_comment,
+        "table_name": table_name,
+        "field_tokens": make_tokens(field_name),
+        "table_tokens": make_tokens(table_name),
+        "category_path": "",
+        "value_text": value_text,
+        "data_type": str(rec.get("data_type") or "").strip(),
+        "data_length": str(rec.get("data_length") or "").strip(),
+        "score": 0,
+    }
 
 
 def normalize_category(category: str) -> str:
@@ -46,189 +127,698 @@ def normalize_category(category: str) -> str:
     return s
 
 
-def classify_rows(
+def summarize_row(r: List[Any], obj: Dict[str, Any]) -> Dict[str, Any]:
+    final_category = obj.get("category_path", "")
+    level = obj.get("result_level", "")
+    rid = obj.get("result_rule_id", "")
+    audits = obj.get("audits", [])
+    score = obj.get("score", 0)
+    marker = obj.get("data_marker", "")
+    hits = obj.get("hits", [])
+    audit_str = ";".join([json.dumps(a, ensure_ascii=False) for a in audits]) if audits else ""
+    tags_str = " ".join([str(h) for h in hits if h]) if hits else ""
+    p = {"row": r, "category": final_category, "level": level, "rid": rid, "audit": audit_str, "score": score, "marker": marker, "tags": tags_str}
+    # 多领域模式：附带最佳领域与各领域的结果摘要
+    if "domain_results" in obj:
+        p["domain"] = obj.get("domain", "")
+        p["domains"] = {d: summarize_row(None, o) for d, o in obj["domain_results"].items()}
+    return p
+
+
+def is_matched(p: Dict[str, Any]) -> bool:
+    return bool(p["category"] or p["level"] or p["rid"])
+
+
+def category_parts(category: str) -> List[str]:
+    return [x for x in str(category).split("/") if x]
+
+
+def rules_max_depth(rules: List[Dict]) -> int:
+    """规则集可能写入的最深分类路径层级，用于流式输出时预先确定分类列数。"""
+    depth = 0
+    for rule in rules:
+        for a in rule.get("actions", []) or []:
+            if a.get("name") == "set_suggested_category":
+                depth = max(depth, len(category_parts((a.get("params") or {}).get("category", ""))))
+    return depth
+
+
+def output_headers(headers: List[str], max_depth: int) -> List[str]:
+    cat_headers = [f"{i}级分类" for i in range(1, max_depth + 1)]
+    return headers + cat_headers + ["数据标识", "分级", "规则ID", "命中标签", "置信度"]
+
+
+def confidence(rid: str) -> str:
+    rid = str(rid or "")
+    if rid.endswith("-H"):
+        return "high"
+    if rid.endswith("-M"):
+        return "medium"
+    return "low"
+
+
+def output_row(p: Dict[str, Any], max_depth: int) -> List[Any]:
+    parts = category_parts(p["category"])
+    conf = confidence(p.get("rid", ""))
+
+    if conf == "low":
+        cat_cols = [""] * max_depth
+        level = ""
+        rid = ""
+    else:
+        cat_cols = parts + ([""] * (max_depth - len(parts)))
+        level = p["level"]
+        rid = p["rid"]
+
+    return [*p["row"], *cat_cols, p.get("marker", ""), level, rid, p.get("tags", ""), conf]
+
+
+def domain_headers(domains: List[str], per_domain: bool) -> List[str]:
+    """多领域模式追加的列：最佳领域，per_domain 时再按领域追加分类路径/分级/规则ID/置信度/得分。"""
+    cols = ["领域"]
+    if per_domain:
+        for d in domains:
+            cols += [f"{d}:分类路径", f"{d}:分级", f"{d}:规则ID", f"{d}:置信度", f"{d}:得分"]
+    return cols
+
+
+def domain_row(p: Dict[str, Any], domains: List[str], per_domain: bool) -> List[Any]:
+    vals = [p.get("domain", "")]
+    if per_domain:
+        for d in domains:
+            res = record_result((p.get("domains") or {}).get(d) or {})
+            vals += [res["category"], res["level"], res["rule_id"], res["confidence"], res["score"]]
+    return vals
+
+
+def record_result(p: Dict[str, Any]) -> Dict[str, Any]:
+    """结果摘要转为 JSON 结果；与表格输出一致，低可信时不给出分类、分级与规则ID。"""
+    conf = confidence(p.get("rid", ""))
+    low = conf == "low"
+    return {
+        "category": "" if low else p["category"],
+        "level": "" if low else p["level"],
+        "rule_id": "" if low else p["rid"],
+        "marker": p.get("marker", ""),
+        "tags": p.get("tags", ""),
+        "confidence": conf,
+        "score": p.get("score", 0),
+    }
+
+
+class WarmRules:
+    """常驻进程内按领域缓存编译好的规则执行器；规则文件（JSON/规则包）变化时重新加载。"""
+
+    def __init__(self, root: str, engine: str = "compiled", cache_size: int = 65536):
+        self.root = root
+        self.engine = engine
+        self.cache_size = cache_size
+        self._engines: Dict[str, Any] = {}
+        self._stamps: Dict[str, Any] = {}
+
+    def _stamp(self, domain: str):
+        stamp = []
+        for name in ("unified_rules.json", "unified_rules.bundle"):
+            try:
+                st = os.stat(os.path.join(self.root, "rules", domain, name))
+                stamp.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def get(self, domain: str):
+        stamp = self._stamp(domain)
+        if domain not in self._engines or self._stamps.get(domain) != stamp:
+            rules, matchers = load_ruleset(domain, self.root)
+            self._engines[domain] = make_engine(rules, self.engine, self.cache_size, matchers)
+            self._stamps[domain] = stamp
+            print(f"[INFO] Rules ready for {domain}: count={len(rules)}")
+        return self._engines[domain]
+
+    def domains(self) -> List[str]:
+        return sorted(self._engines)
+
+
+# 库调用共享的常驻规则：同一进程内多次调用复用已编译的规则集
+_shared_rules: Dict[Any, WarmRules] = {}
+
+
+def classify_records(
     domain: str,
+    records: Iterable[Dict[str, Any]],
+    engine: str = "compiled",
+    cache_size: int = 65536,
+    warm: Optional[WarmRules] = None,
+) -> Iterator[Dict[str, Any]]:
+    """对任意记录源逐条惰性产出分类结果，顺序与输入一致。
+
+    记录字段为 field_name/field_comment/table_name/value_text；结果字段同 record_result，
+    另附原记录于 "record"。规则集在进程内按 (engine, cache_size) 共享，规则文件变化时自动重新加载。
+    """
+    if warm is None:
+        key = (engine, cache_size)
+        warm = _shared_rules.get(key)
+        if warm is None:
+            warm = _shared_rules[key] = WarmRules(os.path.dirname(os.path.dirname(__file__)), engine, cache_size)
+    rule_engine = warm.get(domain)
+    # 列式引擎按批装入数组，其余逐条求值以保持惰性
+    size = COLUMNAR_BATCH_ROWS if hasattr(rule_engine, "evaluate_many") else 1
+    batch: List[Dict[str, Any]] = []
+
+    def _flush():
+        objs = [build_record_obj(rec if isinstance(rec, dict) else {}) for rec in batch]
+        for rec, obj in zip(batch, evaluate_objs(rule_engine, objs)):
+            yield {**record_result(summarize_row(None, obj)), "record": rec}
+
+    for rec in records:
+        batch.append(rec)
+        if len(batch) >= size:
+            yield from _flush()
+            batch = []
+    if batch:
+        yield from _flush()
+
+
+# 多进程模式下每个任务包含的行数
+WORKER_CHUNK_ROWS = 2000
+
+# 列式引擎每批装入数组的行数
+COLUMNAR_BATCH_ROWS = 50000
+
+# 默认的持久结果缓存文件（位于 outputs/ 下）
+RESULT_CACHE_NAME = "result_cache.sqlite"
+
+# 增量模式每块比对指纹的行数：块内未命中的行一次交给分类函数
+INCREMENTAL_BLOCK_ROWS = 50000
+
+# 列画像每次按列累计并检查是否可停止采样的行数
+SAMPLE_BLOCK_ROWS = 256
+
+# 列画像输出中每列的采样信息列
+COLUMN_HEADERS = ["表名", "列名", "读取行数", "样本数", "空值数", "匹配率", "提前停止"]
+
+# 工作进程内的规则执行器，由 _init_worker 在进程启动时构建一次
+_worker_engine = None
+
+
+def make_engine(
+    rules,
+    engine: str = "compiled",
+    cache_size: int = 65536,
+    matchers=None,
+    primary: str = "",
+    stop_first: bool = False,
+):
+    """rules 为 {领域: 规则列表} 时构建多领域执行器（仅 compiled），primary 为固定输出的规则集。"""
+    if isinstance(rules, dict):
+        rule_engine = MultiDomainRules(rules, primary, stop_first)
+    else:
+        rule_engine = build_engine(rules, engine, matchers, stop_first)
+    if getattr(rule_engine, "unsupported", None):
+        print(f"[WARN] Columnar engine falls back to compiled rules: {rule_engine.unsupported}")
+    # 列式引擎按批求值，不叠加逐行记忆
+    if cache_size > 0 and not hasattr(rule_engine, "evaluate_many"):
+        rule_engine = MemoizedRules(rule_engine, cache_size)
+    return rule_engine
+
+
+def _init_worker(
+    rules: List[Dict],
+    engine: str,
+    cache_size: int,
+    matchers=None,
+    primary: str = "",
+    stop_first: bool = False,
+    match_timeout: float = DEFAULT_MATCH_TIMEOUT,
+    regex_backend: str = DEFAULT_REGEX_BACKEND,
+):
+    global _worker_engine
+    set_match_timeout(match_timeout)
+    set_regex_backend(regex_backend)
+    _worker_engine = make_engine(rules, engine, cache_size, matchers, primary, stop_first)
+
+
+def evaluate_objs(rule_engine, objs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    if hasattr(rule_engine, "evaluate_many"):
+        return rule_engine.evaluate_many(objs)
+    return [rule_engine.evaluate(o) for o in objs]
+
+
+def classify_batch(rule_engine, rows: List[List[Any]], cols: Dict[str, int], title: str) -> List[Dict[str, Any]]:
+    objs = [build_row_obj(r, cols, title) for r in rows]
+    return [summarize_row(r, o) for r, o in zip(rows, evaluate_objs(rule_engine, objs))]
+
+
+def _classify_chunk(rows: List[List[Any]], cols: Dict[str, int], title: str):
+    # 本块内的正则超时随结果带回主进程汇总
+    return classify_batch(_worker_engine, rows, cols, title), timeout_log.drain()
+
+
+def serial_classifier(rule_engine):
+    """返回单进程分类函数：rows -> 按原顺序产出的结果摘要；列式引擎按批装入数组求值。"""
+    def run(rows, cols: Dict[str, int], title: str):
+        if not hasattr(rule_engine, "evaluate_many"):
+            for r in rows:
+                yield summarize_row(r, rule_engine.evaluate(build_row_obj(r, cols, title)))
+            return
+        batch = []
+        for r in rows:
+            batch.append(r)
+            if len(batch) >= COLUMNAR_BATCH_ROWS:
+                yield from classify_batch(rule_engine, batch, cols, title)
+                batch = []
+        if batch:
+            yield from classify_batch(rule_engine, batch, cols, title)
+    return run
+
+
+def parallel_classifier(pool, workers: int):
+    """返回多进程分类函数：按块分发到进程池，按提交顺序取回，在途块数有上限以保持内存平稳。"""
+    def _take(pending):
+        results, (guarded, timeouts) = pending.popleft().get()
+        timeout_log.merge(guarded, timeouts)
+        return results
+
+    def run(rows, cols: Dict[str, int], title: str):
+        pending = deque()
+        chunk = []
+        for r in rows:
+            chunk.append(r)
+            if len(chunk) >= WORKER_CHUNK_ROWS:
+                pending.append(pool.apply_async(_classify_chunk, (chunk, cols, title)))
+                chunk = []
+                if len(pending) >= workers * 2:
+                    yield from _take(pending)
+        if chunk:
+            pending.append(pool.apply_async(_classify_chunk, (chunk, cols, title)))
+        while pending:
+            yield from _take(pending)
+    return run
+
+
+def incremental_classifier(
+    classify,
+    previous: Optional[PreviousResults] = None,
+    log: Optional[FingerprintLog] = None,
+    cache: Optional[ResultCache] = None,
+):
+    """返回增量分类函数：按块计算行指纹，先查上次的指纹文件，其次查持久结果缓存，只把
+    仍未命中的行交给 classify 求值并写回缓存；结果按原行序产出，并按块记入 log 供下次运行复用。"""
+    counts = {"reused": 0, "cached": 0, "evaluated": 0}
+
+    def _block(rows, cols: Dict[str, int], title: str):
+        fps = [row_fingerprint(build_row_obj(r, cols, title)) for r in rows]
+        reused = previous.get_many(fps) if previous is not None else {}
+        known = reused
+        if cache is not None:
+            cached = cache.get_many(fp for fp in fps if fp not in reused)
+            known = {**reused, **cached} if reused else cached
+        misses = [r for r, fp in zip(rows, fps) if fp not in known]
+        fresh = iter(classify(misses, cols, title)) if misses else iter(())
+        new_items: Dict[str, Dict[str, Any]] = {}
+        logged: Dict[str, Dict[str, Any]] = {}
+        for r, fp in zip(rows, fps):
+            prev = known.get(fp)
+            if prev is not None:
+                counts["reused" if fp in reused else "cached"] += 1
+                p = {**prev, "row": r}
+            else:
+                counts["evaluated"] += 1
+                p = next(fresh)
+                new_items[fp] = {k: v for k, v in p.items() if k != "row"}
+            if log is not None:
+                logged[fp] = p
+            yield p
+        if cache is not None:
+            cache.put_many(list(new_items.items()))
+        if log is not None:
+            log.add_many(list(logged.items()))
+
+    def run(rows, cols: Dict[str, int], title: str):
+        block = []
+        for r in rows:
+            block.append(r)
+            if len(block) >= INCREMENTAL_BLOCK_ROWS:
+                yield from _block(block, cols, title)
+                block = []
+        if block:
+            yield from _block(block, cols, title)
+
+    run.counts = counts
+    return run
+
+
+def shadow_classifier(classify, diff: ShadowDiff):
+    """返回影子对比分类函数：原样产出现行规则的结果，同时把每行现行/候选结果的差异记入 diff。"""
+    def run(rows, cols: Dict[str, int], title: str):
+        # 行号与表格一致：表头为第 1 行
+        for i, p in enumerate(classify(rows, cols, title), start=2):
+            res = p.get("domains") or {}
+            obj = build_row_obj(p["row"], cols, title)
+            info = {k: obj[k] for k in ("table_name", "field_name", "field_comment")}
+            diff.add(i, info, record_result(res.get(CURRENT) or {}), record_result(res.get(CANDIDATE) or {}))
+            yield p
+    return run
+
+
+def _classify_table(
+    classify,
+    rules: List[Dict],
     in_path: str,
     out_path: str,
-    stop_first: bool,
     sheet_name: str,
+    streaming: bool,
+    in_format: str = "",
+    out_format: str = "",
+    domains: Optional[List[str]] = None,
+    per_domain: bool = False,
 ):
-    root = os.path.dirname(os.path.dirname(__file__))
-    try:
-        unified_rules = load_rules(domain, root)
-        print(f"[DEBUG] Loaded unified rules from {domain}: {len(unified_rules)}")
-    except Exception as e:
-        print(f"[ERROR] Failed to load rules: {e}")
-        return
-
-    # 过滤无效正则的规则（空值或不可编译），避免边缘情况误命中
-    def _valid_rule(rule: Dict) -> bool:
-        cond = rule.get("conditions") or {}
-        def _iter(c):
-            if not isinstance(c, dict):
-                return []
-            items = []
-            for k in ("all", "any"):
-                arr = c.get(k) or []
-                for it in arr:
-                    if isinstance(it, dict):
-                        items.append(it)
-            return items
-        stack = [cond]
-        while stack:
-            cur = stack.pop()
-            for it in _iter(cur):
-                name = str(it.get("name", ""))
-                op = str(it.get("operator", ""))
-                val = it.get("value")
-                if name == "value_text" and op == "matches_regex":
-                    rx = str(val or "")
-                    if not rx:
-                        return False
-                    try:
-                        __import("re").compile(rx)
-                    except Exception:
-                        return False
-        return True
-
-    unified_rules = [r for r in unified_rules if _valid_rule(r)]
-
-    wb = openpyxl.load_workbook(in_path)
-    ws = wb[sheet_name] if sheet_name and sheet_name in wb.sheetnames else wb.active
-
-    headers = [
-        str(c.value or "").strip() for c in next(ws.iter_rows(min_row=1, max_row=1))
-    ]
+    """读取输入表格、分类并写出结果；读写格式按扩展名或显式格式选择（src/layer4_io.py）。
+
+    流式模式逐行分类逐行写出，内存占用不随行数增长：xlsx 以只读迭代输入、只写输出；
+    分类列数取规则集的最大路径深度，无需预扫描结果，因此可能比全量模式多出空的分类列。
+    domains 非空时为多领域模式，在结果列后追加最佳领域及（per_domain 时）各领域结果列。
+    """
+    reader = open_reader(in_path, in_format, sheet_name, read_only=streaming)
+    headers = reader.headers
     cols = detect_columns(headers)
 
     # 调试打印列索引
     print(f"[DEBUG] Column mapping: {cols}")
 
-    rows = []
-    for row in ws.iter_rows(min_row=2):
-        rows.append([c.value for c in row])
-
-    processed = []
-    total_rows = len(rows)
+    total_rows = 0
     matched_rows = 0
+    progress = tqdm(reader.rows(), total=reader.total, desc=f"[PROGRESS] {os.path.basename(in_path)}", unit="row")
+    results = classify(progress, cols, reader.title)
+
+    if streaming:
+        max_depth = rules_max_depth(rules)
+    else:
+        results = list(results)
+        max_depth = 0
+        for p in results:
+            parts = category_parts(p["category"])
+            if len(parts) > max_depth:
+                max_depth = len(parts)
 
-    import re
-    def make_tokens(s: str) -> str:
-        parts = [p for p in re.split(r"[^A-Za-z]+|_+", (s or "").lower()) if p]
-        return " ".join(parts)
-
-    for r in tqdm(rows, desc=f"[PROGRESS] {os.path.basename(in_path)}", unit="row"):
-        field_en = str((r[cols["field_en"]] if cols.get("field_en", -1) >= 0 else "") or "").strip()
-        field_cn = str((r[cols["field_cn"]] if cols.get("field_cn", -1) >= 0 else "") or "").strip()
-        field_name = field_en
-        field_comment = field_cn or field_en
-        table_name = (
-            str(r[cols["table"]]) if cols.get("table", -1) >= 0 and r[cols["table"]] is not None else ws.title
-        )
-        category = ""
-        value_text = str(r[cols["value"]]) if cols["value"] >= 0 and r[cols["value"]] is not None else ""
-
-        obj = {
-            "field_name": field_name,
-            "field_comment": field_comment,
-            "table_name": table_name,
-            "field_tokens": make_tokens(field_name),
-            "table_tokens": make_tokens(table_name),
-            "category_path": category,
-            "value_text": value_text,
-            "score": 0,
-        }
-        vars_obj = ClassificationVariables(obj)
-        acts_obj = ClassificationActions(obj)
-
-        score_rules = []
-        decision_rules = []
-        for rule in unified_rules:
-            acts = rule.get("actions", []) or []
-            if any(a.get("name") == "add_score" for a in acts):
-                score_rules.append(rule)
-            if any(a.get("name") == "set_classification" for a in acts):
-                decision_rules.append(rule)
-
-        run_all(
-            rule_list=score_rules,
-            defined_variables=vars_obj,
-            defined_actions=acts_obj,
-            stop_on_first_trigger=False,
-        )
-
-        def _is_high(rule):
-            for a in rule.get("actions", []) or []:
-                if a.get("name") == "set_classification":
-                    rid = str(a.get("params", {}).get("rule_id", ""))
-                    return rid.endswith("-H")
-            return False
-
-        decision_rules.sort(key=lambda r: (not _is_high(r)))
-
-        run_all(
-            rule_list=decision_rules,
-            defined_variables=vars_obj,
-            defined_actions=acts_obj,
-            stop_on_first_trigger=False,
-        )
-
-        final_category = obj.get("category_path", "")
-        level = obj.get("result_level", "")
-        rid = obj.get("result_rule_id", "")
-        audits = obj.get("audits", [])
-        score = obj.get("score", 0)
-        marker = obj.get("data_marker", "")
-        hits = obj.get("hits", [])
-        audit_str = ";".join([json.dumps(a, ensure_ascii=False) for a in audits]) if audits else ""
-        tags_str = " ".join([str(h) for h in hits if h]) if hits else ""
-
-        if final_category or level or rid:
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    writer = open_writer(out_path, out_format, reader.title, streaming)
+    extra = domain_headers(domains, per_domain) if domains else []
+    writer.append(output_headers(headers, max_depth) + extra)
+    for p in results:
+        total_rows += 1
+        if is_matched(p):
             matched_rows += 1
+        row = output_row(p, max_depth)
+        if domains:
+            row += domain_row(p, domains, per_domain)
+        writer.append(row)
+    writer.close()
+    reader.close()
+    return total_rows, matched_rows
+
+
+def report_regex_backend(rules: List[Dict], top: int = 5):
+    """启动检查：非 re 后端下逐条确认样本值正则能否原生执行，列出回退到 re 的正则。"""
+    if get_regex_backend() == "re":
+        return
+    rxs = [
+        str(leaf.get("value") or "")
+        for rule in rules for leaf in iter_leaves(rule.get("conditions") or {})
+        if leaf.get("operator") == "matches_regex"
+    ]
+    st = check_patterns(rxs)
+    print(
+        f"[INFO] Regex backend {st['backend']}: native={st['native']} (ascii_only={st['ascii_only']}), "
+        f"fallback={len(st['fallback'])}"
+    )
+    for rx, reason in sorted(st["fallback"].items())[:top]:
+        print(f"[INFO]   fallback to re: reason={reason}, regex={rx}")
+
+
+def report_regex_timeouts(top: int = 5):
+    """运行摘要：受保护（有回溯风险）的正则数与超时次数；超时的匹配按未命中处理。"""
+    guarded, timeouts = timeout_log.drain()
+    if not timeouts:
+        if guarded:
+            print(f"[INFO] Regex guard: guarded={len(guarded)}, timeouts=0, limit_ms={get_match_timeout() * 1000:g}")
+        return
+    print(
+        f"[WARN] Regex guard: guarded={len(guarded)}, timeouts={sum(timeouts.values())}, "
+        f"patterns={len(timeouts)}, limit_ms={get_match_timeout() * 1000:g} (timed-out matches count as no match)"
+    )
+    for rx, n in sorted(timeouts.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"[WARN]   timeouts={n}, risks={','.join(guarded.get(rx, []))}, regex={rx}")
 
-        processed.append({"row": r, "category": final_category, "level": level, "rid": rid, "audit": audit_str, "score": score, "marker": marker, "tags": tags_str})
-
-    max_depth = 0
-    for p in processed:
-        parts = [x for x in str(p["category"]).split("/") if x]
-        if len(parts) > max_depth:
-            max_depth = len(parts)
-
-    cat_headers = [f"{i}级分类" for i in range(1, max_depth + 1)]
-    new_headers = headers + cat_headers + ["数据标识", "分级", "规则ID", "命中标签", "置信度"]
-    out_wb = openpyxl.Workbook()
-    out_ws = out_wb.active
-    out_ws.title = ws.title
-    out_ws.append(new_headers)
-
-    for p in processed:
-        parts = [x for x in str(p["category"]).split("/") if x]
-        rid = str(p.get("rid", "") or "")
-        if rid.endswith("-H"):
-            conf = "high"
-        elif rid.endswith("-M"):
-            conf = "medium"
-        else:
-            conf = "low"
 
-        if conf == "low":
-            cat_cols = [""] * max_depth
-            level = ""
-            rid = ""
+def classify_rows(
+    domain: str,
+    in_path: str,
+    out_path: str,
+    stop_first: bool,
+    sheet_name: str,
+    engine: str = "compiled",
+    cache_size: int = 65536,
+    streaming: bool = False,
+    workers: int = 1,
+    in_format: str = "",
+    out_format: str = "",
+    profile: bool = False,
+    incremental: str = "",
+    result_cache: str = "",
+    result_cache_size: int = 1000000,
+    per_domain: bool = False,
+    shadow: str = "",
+):
+    """shadow 为候选规则（unified_rules.json 或规则目录）时，与现行规则共享特征提取一并求值，
+    输出仍为现行规则结果，另在输出旁写出差异报告 <file>.classified.shadow.json/.csv。
+    domain 为逗号分隔的多个领域时，一次读取与特征提取、同时求值各领域规则，输出最佳领域
+    （per_domain 时另附各领域结果）。incremental 为上次的分类输出或其指纹文件路径时，规则集哈希一致则复用未变行的结果，只重算新增/改动行；
+    无论是否复用，都会在本次输出旁写出新的指纹文件。result_cache 为持久结果缓存（SQLite）路径，
+    按 (领域, 规则集哈希, 行指纹) 跨运行、跨进程共享结果，条目数上限为 result_cache_size。"""
+    root = os.path.dirname(os.path.dirname(__file__))
+    domains = [d.strip() for d in domain.split(",") if d.strip()]
+    try:
+        if len(domains) > 1:
+            # 多领域：匹配器按合并后的规则重建，不复用各领域规则包中的匹配器
+            unified_rules = {d: load_ruleset(d, root)[0] for d in domains}
+            matchers = None
+            flat_rules = [r for rules in unified_rules.values() for r in rules]
         else:
-            cat_cols = parts + ([""] * (max_depth - len(parts)))
-            level = p["level"]
-            rid = p["rid"]
-
-        out_ws.append([*p["row"], *cat_cols, p.get("marker", ""), level, rid, p.get("tags", ""), conf])
-
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    out_wb.save(out_path)
+            domains = []
+            unified_rules, matchers = load_ruleset(domain, root)
+            flat_rules = unified_rules
+        print(f"[DEBUG] Loaded unified rules from {domain}: {len(flat_rules)}")
+        primary = ""
+        if shadow:
+            if domains:
+                raise ValueError("shadow evaluation takes a single domain")
+            candidate = load_candidate(shadow)
+            print(f"[DEBUG] Loaded candidate rules from {shadow}: {len(candidate)}")
+            # 现行与候选规则作为两套规则集同时求值，输出固定取现行结果
+            unified_rules = {CURRENT: unified_rules, CANDIDATE: candidate}
+            matchers = None
+            primary = CURRENT
+    except Exception as e:
+        print(f"[ERROR] Failed to load rules: {e}")
+        return
+    # 超时按文件统计
+    timeout_log.drain()
+    report_regex_backend(
+        [r for rules in unified_rules.values() for r in rules] if isinstance(unified_rules, dict) else flat_rules
+    )
+
+    if domains or shadow:
+        if profile:
+            print("[WARN] Profiling is not supported for multiple rulesets; --profile is ignored")
+            profile = False
+        if engine != "compiled":
+            print(f"[WARN] Multiple rulesets run on the compiled engine; --engine {engine} is ignored")
+            engine = "compiled"
+
+    if stop_first and profile:
+        # 剖析按原顺序逐条求值全部规则，不做提前终止
+        print("[WARN] Profiling evaluates every rule; --stop-first is ignored")
+        stop_first = False
+    if result_cache and profile:
+        # 剖析需要逐行求值，缓存命中的行不会计入规则统计
+        print("[WARN] Profiling evaluates every row; --result-cache is ignored")
+        result_cache = ""
+    if incremental and profile:
+        # 复用上次结果的行不再求值，规则统计会漏掉这些行
+        print("[WARN] Profiling evaluates every row; --incremental is ignored")
+        incremental = ""
+    log = None
+    previous = None
+    cache = None
+    if incremental or result_cache:
+        # 命中即停改变结果语义，与全量求值的结果分开复用
+        digest = ruleset_digest(unified_rules, {"stop_first": True} if stop_first else None)
+        if incremental:
+            previous = load_previous(incremental, digest)
+            log = FingerprintLog(out_path, digest)
+        if result_cache:
+            cache = ResultCache(result_cache, domain, digest, result_cache_size)
+
+    diff = ShadowDiff() if shadow else None
+
+    def _run(classify):
+        if log is not None or cache is not None:
+            classify = incremental_classifier(classify, previous, log, cache)
+        if diff is not None:
+            classify = shadow_classifier(classify, diff)
+        try:
+            res = _classify_table(
+                classify, flat_rules, in_path, out_path, sheet_name, streaming, in_format, out_format,
+                domains, per_domain,
+            )
+        except BaseException:
+            if log is not None:
+                log.discard()
+            raise
+        finally:
+            evicted = cache.close() if cache is not None else 0
+            if previous is not None:
+                previous.close()
+        if log is not None or cache is not None:
+            counts = classify.counts
+            print(
+                f"[INFO] Incremental: reused={counts['reused']}, cached={counts['cached']}, "
+                f"evaluated={counts['evaluated']}"
+            )
+        if log is not None:
+            print(f"[INFO] Saved fingerprints to: {log.close()}")
+        if cache is not None:
+            st = cache.stats()
+            print(
+                f"[INFO] Result cache: hits={st['hits']}, misses={st['misses']}, writes={st['writes']}, "
+                f"evicted={evicted}, hit_ratio={st['hit_ratio']:.2%}, path={cache.path}"
+            )
+        return res
+
+    rule_engine = None
+    if profile:
+        # 逐条计时需在单进程内按原顺序求值，不叠加记忆与多进程
+        if workers > 1:
+            print("[WARN] Profiling runs in a single process; --workers is ignored")
+        rule_engine = ProfiledRules(unified_rules)
+        total_rows, matched_rows = _run(serial_classifier(rule_engine))
+    elif workers > 1:
+        # 规则集只在每个工作进程启动时传入并编译一次
+        initargs = (
+            unified_rules, engine, cache_size, matchers, primary, stop_first, get_match_timeout(), get_regex_backend(),
+        )
+        with Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+            total_rows, matched_rows = _run(parallel_classifier(pool, workers))
+    else:
+        rule_engine = make_engine(unified_rules, engine, cache_size, matchers, primary, stop_first)
+        total_rows, matched_rows = _run(serial_classifier(rule_engine))
     print(f"[INFO] Saved result to: {out_path}")
 
     # 末尾调试统计信息
     ratio = (matched_rows / total_rows) if total_rows > 0 else 0.0
     print(f"[INFO] Stats: total_rows={total_rows}, matched_rows={matched_rows}, matched_ratio={ratio:.2%}")
+    report_regex_timeouts()
+    if isinstance(rule_engine, MemoizedRules):
+        st = rule_engine.stats()
+        print(
+            f"[INFO] Memo: hits={st['hits']}, misses={st['misses']}, size={st['size']}, "
+            f"hit_ratio={st['hit_ratio']:.2%}, fields={','.join(rule_engine.fields)}"
+        )
+    if isinstance(rule_engine, ProfiledRules):
+        json_path, _ = rule_engine.write_report(os.path.splitext(out_path)[0])
+        for typ, g in sorted(rule_engine.report()["groups"].items()):
+            print(
+                f"[INFO] Profile {typ}: rules={g['rules']}, never_triggered={g['never_triggered']}, "
+                f"time_ms={g['time_ms']}, triggers={g['triggers']}, rows_affected={g['rows_affected']}"
+            )
+        print(f"[INFO] Saved profile to: {json_path}")
+    if diff is not None:
+        json_path, _ = diff.write_report(os.path.splitext(out_path)[0])
+        summary = diff.report()["summary"]
+        print(
+            f"[INFO] Shadow: rows={summary['rows']}, changed={summary['changed']}, category={summary['category']}, "
+            f"level={summary['level']}, confidence={summary['confidence']}"
+        )
+        print(f"[INFO] Saved shadow diff to: {json_path}")
+
+
+def classify_columns(
+    domain: str,
+    in_path: str,
+    out_path: str,
+    stop_first: bool,
+    sheet_name: str,
+    in_format: str = "",
+    out_format: str = "",
+    match_threshold: float = 0.8,
+    sample_size: int = 5000,
+    sample_rows: int = 100000,
+):
+    """列画像：输入为数据表本身（CSV/Parquet/SQLite 等，每列为一个字段、每行为一条数据），按列流式采样真实值，
+    以列名与样本命中率执行规则，每列输出一行：采样信息、分类、分级、规则ID 与匹配率。
+
+    样本值上的关键词/正则命中率达到 match_threshold 视为该列命中；所有列的命中与否在统计上都已确定时即停止读取，
+    否则每列最多采样 sample_size 个非空值或读取 sample_rows 行（src/rules/sampling.py）。仅支持 compiled 引擎。
+    """
+    root = os.path.dirname(os.path.dirname(__file__))
+    try:
+        if len([d for d in domain.split(",") if d.strip()]) > 1:
+            raise ValueError("column profiling takes a single domain")
+        rules, matchers = load_ruleset(domain, root)
+    except Exception as e:
+        print(f"[ERROR] Failed to load rules: {e}")
+        return
+    print(f"[DEBUG] Loaded unified rules from {domain}: {len(rules)}")
+    timeout_log.drain()
+    report_regex_backend(rules)
+    sampler = ColumnSampler(CompiledRules(rules, matchers, stop_first), match_threshold, sample_size, sample_rows)
+
+    reader = open_reader(in_path, in_format, sheet_name, read_only=True)
+    columns = [ColumnSample(h or f"column{i + 1}") for i, h in enumerate(reader.headers)]
+    block: List[List[Any]] = []
+    done = not columns
+    progress = tqdm(reader.rows(), total=reader.total, desc=f"[SAMPLE] {os.path.basename(in_path)}", unit="row")
+    for r in progress:
+        if done:
+            break
+        block.append(r)
+        if len(block) >= SAMPLE_BLOCK_ROWS:
+            done = sampler.add_rows(columns, block)
+            block = []
+    progress.close()
+    if block and not done:
+        sampler.add_rows(columns, block)
+    reader.close()
+
+    max_depth = rules_max_depth(rules)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    writer = open_writer(out_path, out_format, reader.title)
+    writer.append(output_headers(COLUMN_HEADERS, max_depth))
+    matched = 0
+    for col in columns:
+        obj = build_record_obj(
+            {"field_name": col.name, "table_name": reader.title, "value_text": sampler.sample_value(col)}
+        )
+        info = [
+            reader.title, col.name, col.rows, col.values, col.nulls,
+            round(sampler.match_ratio(col), 4), "是" if col.early else "否",
+        ]
+        p = summarize_row(info, sampler.classify(col, obj))
+        if is_matched(p):
+            matched += 1
+        writer.append(output_row(p, max_depth))
+    writer.close()
+    print(f"[INFO] Saved column profile to: {out_path}")
+
+    checked = sum(col.values for col in columns)
+    rows_read = max((col.rows for col in columns), default=0)
+    early = sum(1 for col in columns if col.early)
+    print(
+        f"[INFO] Columns: total={len(columns)}, matched={matched}, decided_early={early}, "
+        f"rows_read={rows_read}, values_checked={checked}"
+    )
+    report_regex_timeouts()
 
 
 def process_domain(
@@ -236,16 +826,76 @@ def process_domain(
     input_file: str,
     stop_first: bool,
     sheet_name: str,
+    engine: str = "compiled",
+    cache_size: int = 65536,
+    streaming: bool = False,
+    workers: int = 1,
+    in_format: str = "",
+    out_format: str = "",
+    profile: bool = False,
+    incremental: str = "",
+    result_cache: str = "",
+    result_cache_size: int = 1000000,
+    per_domain: bool = False,
+    shadow: str = "",
+    columns: bool = False,
+    match_threshold: float = 0.8,
+    sample_size: int = 5000,
+    sample_rows: int = 100000,
+    regex_timeout: float = DEFAULT_MATCH_TIMEOUT,
+    regex_backend: str = DEFAULT_REGEX_BACKEND,
 ):
+    """incremental 为 "true" 时与本次输出路径上次留下的指纹文件比对，其余非空值视为上次输出/指纹文件路径。
+    domain 为逗号分隔的多个领域时，结果写入 outputs/<领域1+领域2>/。
+    columns 为真时输入视为数据表本身，按列采样画像，结果写入 <file>.columns.<ext>。
+    regex_timeout 为有回溯风险的正则单次匹配的时间上限（秒，0 为不限）；regex_backend 为正则执行后端
+    （re / re2 / auto，见 src/rules/regex_backend.py）。"""
     root = os.path.dirname(os.path.dirname(__file__))
-    if input_file:
-        base = os.path.splitext(os.path.basename(input_file))[0]
-        out_dir = os.path.join(root, "outputs", domain)
-        out_path = os.path.join(out_dir, base + ".classified.xlsx")
-        classify_rows(
-            domain, input_file, out_path, stop_first, sheet_name
-        )
+    set_match_timeout(regex_timeout)
+    try:
+        set_regex_backend(regex_backend)
+    except RuntimeError as e:
+        print(f"[ERROR] {e}")
+        return
+    out_name = "+".join(d.strip() for d in domain.split(",") if d.strip())
+
+    def _previous(out_path: str) -> str:
+        if not incremental or incremental.lower() == "false":
+            return ""
+        return out_path if incremental.lower() == "true" else incremental
+
+    # 持久结果缓存："true" 使用 outputs/result_cache.sqlite，其余非空值视为缓存文件路径
+    if result_cache.lower() == "false":
+        result_cache = ""
+    elif result_cache.lower() == "true":
+        result_cache = os.path.join(root, "outputs", RESULT_CACHE_NAME)
+
+    def _run(in_path: str, fmt_in: str):
+        base = os.path.splitext(os.path.basename(in_path))[0]
+        out_dir = os.path.join(root, "outputs", out_name)
+        # 输出格式默认与输入一致；输入格式不可写出（如数据库结构）时写 csv
+        fmt = out_format or detect_format(in_path, fmt_in)
+        if fmt not in WRITERS:
+            fmt = "csv"
+        if columns:
+            if engine != "compiled":
+                print(f"[WARN] Column profiling runs on the compiled engine; --engine {engine} is ignored")
+            out_path = os.path.join(out_dir, base + ".columns" + format_extension(fmt))
+            classify_columns(
+                domain, in_path, out_path, stop_first, sheet_name, fmt_in, fmt,
+                match_threshold, sample_size, sample_rows,
+            )
+        else:
+            out_path = os.path.join(out_dir, base + ".classified" + format_extension(fmt))
+            classify_rows(
+                domain, in_path, out_path, stop_first, sheet_name, engine, cache_size, streaming, workers,
+                fmt_in, fmt, profile, _previous(out_path),
+                result_cache, result_cache_size, per_domain, shadow,
+            )
         print(out_path)
+
+    if input_file:
+        _run(input_file, in_format)
         return
 
     in_dir = os.path.join(root, "test", "data", domain)
@@ -253,29 +903,71 @@ def process_domain(
         print(f"[ERROR] Input directory not found: {in_dir}")
         return
 
-    files = [f for f in os.listdir(in_dir) if f.lower().endswith(".xlsx")]
+    exts = tuple(FORMAT_EXTENSIONS)
+    files = [f for f in os.listdir(in_dir) if f.lower().endswith(exts)]
     print(f"[DEBUG] Found files: {files}")
     for f in tqdm(files, desc=f"[FILES] {domain}", unit="file"):
-        in_path = os.path.join(in_dir, f)
-        base = os.path.splitext(f)[0]
-        out_dir = os.path.join(root, "outputs", domain)
-        out_path = os.path.join(out_dir, base + ".classified.xlsx")
-        classify_rows(
-            domain, in_path, out_path, stop_first, sheet_name
-        )
-        print(out_path)
+        _run(os.path.join(in_dir, f), "")
 
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("domain")
+    parser.add_argument("domain", help="domain, or comma separated domains to classify in one pass")
     parser.add_argument("--input", dest="input", default=None)
     parser.add_argument("--stop-first", dest="stop_first", default="false")
     parser.add_argument("--sheet", dest="sheet", default="")
+    parser.add_argument("--engine", dest="engine", default="compiled", choices=sorted(ENGINES))
+    parser.add_argument("--cache-size", dest="cache_size", type=int, default=65536)
+    parser.add_argument("--streaming", dest="streaming", default="false")
+    parser.add_argument("--workers", dest="workers", type=int, default=1)
+    parser.add_argument("--format", dest="in_format", default="", choices=["", *sorted(READERS)])
+    parser.add_argument("--output-format", dest="out_format", default="", choices=["", *sorted(WRITERS)])
+    parser.add_argument("--profile", dest="profile", default="false")
+    parser.add_argument(
+        "--incremental", dest="incremental", default="",
+        help="'true' to reuse the previous output's fingerprints, or a previous output/fingerprints file path",
+    )
+    parser.add_argument(
+        "--result-cache", dest="result_cache", default="",
+        help="'true' for outputs/result_cache.sqlite, or a SQLite path shared across runs",
+    )
+    parser.add_argument("--result-cache-size", dest="result_cache_size", type=int, default=1000000)
+    parser.add_argument(
+        "--multi-output", dest="multi_output", default="best", choices=["best", "all"],
+        help="with several domains: best-scoring domain only, or also per-domain result columns",
+    )
+    parser.add_argument(
+        "--shadow", dest="shadow", default="",
+        help="candidate unified_rules.json (or rules directory) to diff against the current ruleset",
+    )
+    parser.add_argument(
+        "--columns", dest="columns", default="false",
+        help="treat the input as a data table and classify each column from sampled values",
+    )
+    parser.add_argument("--match-threshold", dest="match_threshold", type=float, default=0.8)
+    parser.add_argument("--sample-size", dest="sample_size", type=int, default=5000)
+    parser.add_argument("--sample-rows", dest="sample_rows", type=int, default=100000)
+    parser.add_argument(
+        "--regex-timeout", dest="regex_timeout", type=float, default=DEFAULT_MATCH_TIMEOUT * 1000,
+        help="per-match time limit in ms for backtracking-prone regexes, 0 to disable",
+    )
+    parser.add_argument(
+        "--regex-backend", dest="regex_backend", default=DEFAULT_REGEX_BACKEND, choices=list(REGEX_BACKENDS),
+        help="re (stdlib), re2 (linear time, needs google-re2), or auto (re2 when installed)",
+    )
     args = parser.parse_args()
 
     stop_first = str(args.stop_first).lower() != "false"
-    process_domain(args.domain, args.input, stop_first, args.sheet)
+    streaming = str(args.streaming).lower() != "false"
+    profile = str(args.profile).lower() != "false"
+    columns = str(args.columns).lower() != "false"
+    process_domain(
+        args.domain, args.input, stop_first, args.sheet, args.engine, args.cache_size, streaming, args.workers,
+        args.in_format, args.out_format, profile, args.incremental,
+        args.result_cache, args.result_cache_size, args.multi_output == "all", args.shadow,
+        columns, args.match_threshold, args.sample_size, args.sample_rows, args.regex_timeout / 1000,
+        args.regex_backend,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,464 @@
+import os
+import re
+import csv
+import json
+import sqlite3
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import openpyxl
+
+
+# 文件扩展名 -> 表格格式
+FORMAT_EXTENSIONS = {
+    ".xlsx": "xlsx",
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".parquet": "parquet",
+    ".sqlite": "sqlite",
+    ".db": "sqlite",
+}
+
+# Parquet 写出时每批缓冲的行数
+PARQUET_BATCH_ROWS = 50000
+
+# SQLite 写出时每批插入的行数
+SQLITE_BATCH_ROWS = 5000
+
+# 数据库结构读取：每张表取前若干行，为每列找第一个非空值作为字段样本
+SCHEMA_SAMPLE_ROWS = 100
+
+# 数据库结构读取产出的表头，与 detect_columns 识别的列名一致
+SCHEMA_HEADERS = ["表名", "字段名", "字段注释", "字段类型", "字段样本"]
+
+# information_schema 中不参与分类的系统库
+_SYSTEM_SCHEMAS = frozenset({"information_schema", "pg_catalog", "mysql", "performance_schema", "sys"})
+
+# SQLite 建表语句中列定义行尾的 "-- 注释"
+_COLUMN_COMMENT = re.compile(
+    r'^\s*(?:"((?:[^"]|"")+)"|`([^`]+)`|\[([^\]]+)\]|([^\s,()]+))[^\n]*?--[ \t]*(.*?)[ \t]*$', re.M
+)
+
+
+def detect_format(path: str, fmt: str = "") -> str:
+    """显式指定优先，否则按扩展名判断格式。"""
+    if fmt:
+        if fmt not in READERS:
+            raise ValueError(f"unsupported format: {fmt}")
+        return fmt
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMAT_EXTENSIONS:
+        raise ValueError(f"unsupported file extension: {ext}")
+    return FORMAT_EXTENSIONS[ext]
+
+
+def format_extension(fmt: str) -> str:
+    for ext, f in FORMAT_EXTENSIONS.items():
+        if f == fmt:
+            return ext
+    raise ValueError(f"unsupported format: {fmt}")
+
+
+def _pad(values, width: int) -> List[Any]:
+    row = list(values)
+    return row + [None] * (width - len(row))
+
+
+class XlsxReader:
+    """read_only 为真时只读迭代（行尾空单元格补齐到表头宽度），否则整表载入。"""
+
+    def __init__(self, path: str, sheet_name: str = "", read_only: bool = False):
+        self.read_only = read_only
+        self.wb = openpyxl.load_workbook(path, read_only=read_only)
+        self.ws = self.wb[sheet_name] if sheet_name and sheet_name in self.wb.sheetnames else self.wb.active
+        self.title = self.ws.title
+        if read_only:
+            header_row = next(self.ws.iter_rows(min_row=1, max_row=1, values_only=True), ())
+            self.headers = [str(v or "").strip() for v in header_row]
+        else:
+            self.headers = [
+                str(c.value or "").strip() for c in next(self.ws.iter_rows(min_row=1, max_row=1))
+            ]
+        self.total = (self.ws.max_row - 1) if self.ws.max_row else None
+
+    def rows(self) -> Iterator[List[Any]]:
+        if not self.read_only:
+            for row in self.ws.iter_rows(min_row=2):
+                yield [c.value for c in row]
+            return
+        width = len(self.headers)
+        for values in self.ws.iter_rows(min_row=2, values_only=True):
+            yield _pad(values, width)
+
+    def close(self):
+        if self.read_only:
+            self.wb.close()
+
+
+class CsvReader:
+    def __init__(self, path: str, sheet_name: str = "", read_only: bool = False):
+        self.f = open(path, "r", encoding="utf-8-sig", newline="")
+        self.reader = csv.reader(self.f)
+        self.title = os.path.splitext(os.path.basename(path))[0]
+        self.headers = [str(v or "").strip() for v in next(self.reader, [])]
+        self.total = None
+
+    def rows(self) -> Iterator[List[Any]]:
+        width = len(self.headers)
+        for values in self.reader:
+            # 空单元格按 None 处理，与 Excel 空单元格一致
+            yield _pad([v if v != "" else None for v in values], width)
+
+    def close(self):
+        self.f.close()
+
+
+class JsonlReader:
+    """每行一个 JSON 对象；表头取首条记录的键，后续记录按表头取值。"""
+
+    def __init__(self, path: str, sheet_name: str = "", read_only: bool = False):
+        self.f = open(path, "r", encoding="utf-8")
+        self.title = os.path.splitext(os.path.basename(path))[0]
+        self._first: Optional[Dict[str, Any]] = None
+        for line in self.f:
+            if line.strip():
+                self._first = json.loads(line)
+                break
+        self.headers = [str(k) for k in (self._first or {})]
+        self.total = None
+
+    def rows(self) -> Iterator[List[Any]]:
+        keys = list(self._first or {})
+        if self._first is not None:
+            yield [self._first.get(k) for k in keys]
+        for line in self.f:
+            if line.strip():
+                rec = json.loads(line)
+                yield [rec.get(k) for k in keys]
+
+    def close(self):
+        self.f.close()
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError(
+            "Missing dependency pyarrow. Install via: pip install pyarrow"
+        )
+    return pyarrow
+
+
+class ParquetReader:
+    def __init__(self, path: str, sheet_name: str = "", read_only: bool = False):
+        pa = _require_pyarrow()
+        self.pf = pa.parquet.ParquetFile(path)
+        self.title = os.path.splitext(os.path.basename(path))[0]
+        self.headers = [str(n) for n in self.pf.schema_arrow.names]
+        self.total = self.pf.metadata.num_rows
+
+    def rows(self) -> Iterator[List[Any]]:
+        for batch in self.pf.iter_batches():
+            cols = [c.to_pylist() for c in batch.columns]
+            for values in zip(*cols):
+                yield list(values)
+
+    def close(self):
+        self.pf.close()
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class SqliteReader:
+    """SQLite 数据库中的一张表（或视图）；sheet_name 为表名，缺省或不存在时取按名称排序的第一张表；对应写出格式见 SqliteWriter。"""
+
+    def __init__(self, path: str, sheet_name: str = "", read_only: bool = False):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"sqlite database not found: {path}")
+        self.conn = sqlite3.connect(path)
+        tables = [
+            r[0] for r in self.conn.execute(
+                "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%' ORDER BY name"
+            )
+        ]
+        if not tables:
+            self.conn.close()
+            raise ValueError(f"no tables in sqlite database: {path}")
+        self.title = sheet_name if sheet_name in tables else tables[0]
+        # 游标逐批取行，提前停止读取时不扫描整表
+        self.cur = self.conn.execute(f"SELECT * FROM {_quote(self.title)}")
+        self.headers = [str(d[0] or "").strip() for d in self.cur.description]
+        self.total = None
+
+    def rows(self) -> Iterator[List[Any]]:
+        for values in self.cur:
+            yield list(values)
+
+    def close(self):
+        self.conn.close()
+
+
+def _sqlite_catalog(conn) -> Iterator[Tuple[str, List[Tuple[str, str, str]]]]:
+    """SQLite：表/视图及其列 (列名, 类型, 注释)；注释取建表语句中列定义行尾的 "-- 注释"。"""
+    tables = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    ).fetchall()
+    for name, sql in tables:
+        comments = {}
+        for m in _COLUMN_COMMENT.finditer(sql or ""):
+            quoted, back, bracket, bare, comment = m.groups()
+            comments[(quoted or "").replace('""', '"') or back or bracket or bare] = comment
+        cols = conn.execute(f"PRAGMA table_info({_quote(name)})").fetchall()
+        yield name, [(c[1], str(c[2] or ""), comments.get(c[1], "")) for c in cols]
+
+
+def _information_schema_catalog(conn) -> Iterator[Tuple[str, List[Tuple[str, str, str]]]]:
+    """其他 DB-API 连接：按 information_schema.columns 读取；支持 column_comment 的库（如 MySQL）带出注释。"""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT table_schema, table_name, column_name, data_type, column_comment FROM information_schema.columns"
+            " ORDER BY table_schema, table_name, ordinal_position"
+        )
+    except Exception:
+        conn.rollback()
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT table_schema, table_name, column_name, data_type, '' FROM information_schema.columns"
+            " ORDER BY table_schema, table_name, ordinal_position"
+        )
+    key, cols = None, []
+    for schema, table, column, dtype, comment in cur:
+        if str(schema).lower() in _SYSTEM_SCHEMAS:
+            continue
+        if (schema, table) != key:
+            if cols:
+                yield f"{key[0]}.{key[1]}", cols
+            key, cols = (schema, table), []
+        cols.append((str(column), str(dtype or ""), str(comment or "")))
+    if cols:
+        yield f"{key[0]}.{key[1]}", cols
+
+
+def _sqlite_samples(conn, table: str, n: int) -> Dict[str, Any]:
+    cur = conn.execute(f"SELECT * FROM {_quote(table)} LIMIT {int(n)}")
+    names = [d[0] for d in cur.description]
+    found: Dict[str, Any] = {}
+    for values in cur:
+        for k, v in zip(names, values):
+            if k not in found and v is not None and str(v).strip():
+                found[k] = v
+        if len(found) == len(names):
+            break
+    return found
+
+
+def iter_schema(conn, samples: int = SCHEMA_SAMPLE_ROWS) -> Iterator[List[Any]]:
+    """逐表逐列产出 [表名, 字段名, 字段注释, 字段类型, 字段样本]，不做整库导出。
+
+    conn 为任意 DB-API 连接：sqlite3 连接读取 sqlite_master/PRAGMA，并从每张表的前 samples 行取各列第一个非空值
+    作为样本（samples 为 0 时不取）；其他连接读取 information_schema.columns，不取样本（各库取样语法不一）。
+    """
+    if isinstance(conn, sqlite3.Connection):
+        for table, cols in _sqlite_catalog(conn):
+            found = _sqlite_samples(conn, table, samples) if samples > 0 and cols else {}
+            for column, dtype, comment in cols:
+                yield [table, column, comment, dtype, found.get(column)]
+        return
+    for table, cols in _information_schema_catalog(conn):
+        for column, dtype, comment in cols:
+            yield [table, column, comment, dtype, None]
+
+
+def schema_records(conn, samples: int = SCHEMA_SAMPLE_ROWS) -> Iterator[Dict[str, Any]]:
+    """iter_schema 的记录形式（field_name/field_comment/table_name/value_text/data_type），可直接交给 classify_records。"""
+    for table, column, comment, dtype, sample in iter_schema(conn, samples):
+        yield {
+            "table_name": table,
+            "field_name": column,
+            "field_comment": comment,
+            "data_type": dtype,
+            "value_text": sample,
+        }
+
+
+class SchemaReader:
+    """SQLite 数据库的结构（而非数据）：每个字段一行，列为 表名/字段名/字段注释/字段类型/字段样本，逐表流式读取。"""
+
+    def __init__(self, path: str, sheet_name: str = "", read_only: bool = False):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"sqlite database not found: {path}")
+        self.conn = sqlite3.connect(path)
+        self.title = os.path.splitext(os.path.basename(path))[0]
+        self.headers = list(SCHEMA_HEADERS)
+        self.total = None
+
+    def rows(self) -> Iterator[List[Any]]:
+        yield from iter_schema(self.conn)
+
+    def close(self):
+        self.conn.close()
+
+
+class XlsxWriter:
+    """streaming 为真时使用 write_only 工作簿逐行落盘。"""
+
+    def __init__(self, path: str, title: str, streaming: bool = False):
+        self.path = path
+        if streaming:
+            self.wb = openpyxl.Workbook(write_only=True)
+            self.ws = self.wb.create_sheet(title=title)
+        else:
+            self.wb = openpyxl.Workbook()
+            self.ws = self.wb.active
+            self.ws.title = title
+
+    def append(self, row: List[Any]):
+        self.ws.append(row)
+
+    def close(self):
+        self.wb.save(self.path)
+
+
+class CsvWriter:
+    def __init__(self, path: str, title: str, streaming: bool = False):
+        self.f = open(path, "w", encoding="utf-8-sig", newline="")
+        self.writer = csv.writer(self.f)
+
+    def append(self, row: List[Any]):
+        self.writer.writerow(["" if v is None else v for v in row])
+
+    def close(self):
+        self.f.close()
+
+
+class JsonlWriter:
+    """首行视为表头，之后每行按表头写成一个 JSON 对象。"""
+
+    def __init__(self, path: str, title: str, streaming: bool = False):
+        self.f = open(path, "w", encoding="utf-8")
+        self.headers: Optional[List[str]] = None
+
+    def append(self, row: List[Any]):
+        if self.headers is None:
+            self.headers = [str(h) for h in row]
+            return
+        rec = dict(zip(self.headers, row))
+        self.f.write(json.dumps(rec, ensure_ascii=False, default=str) + "\n")
+
+    def close(self):
+        self.f.close()
+
+
+class ParquetWriter:
+    """首行视为表头；所有列按字符串写出，按批缓冲后写入行组。"""
+
+    def __init__(self, path: str, title: str, streaming: bool = False):
+        self.pa = _require_pyarrow()
+        self.path = path
+        self.headers: Optional[List[str]] = None
+        self.buf: List[List[Any]] = []
+        self.writer = None
+
+    def append(self, row: List[Any]):
+        if self.headers is None:
+            # 重复列名（如空表头）加序号区分
+            seen: Dict[str, int] = {}
+            headers = []
+            for h in row:
+                h = str(h)
+                n = seen.get(h, 0)
+                seen[h] = n + 1
+                headers.append(h if n == 0 else f"{h}.{n}")
+            self.headers = headers
+            self.schema = self.pa.schema([(h, self.pa.string()) for h in headers])
+            self.writer = self.pa.parquet.ParquetWriter(self.path, self.schema)
+            return
+        self.buf.append(row)
+        if len(self.buf) >= PARQUET_BATCH_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if not self.buf:
+            return
+        cols = list(zip(*self.buf))
+        arrays = [
+            self.pa.array([None if v is None else str(v) for v in col], type=self.pa.string()) for col in cols
+        ]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+        self.buf = []
+
+    def close(self):
+        if self.writer is None:
+            return
+        self._flush()
+        self.writer.close()
+
+
+class SqliteWriter:
+    """首行视为表头，写入目标库中以 title 命名的表（已存在时替换）；所有列为 TEXT，按批插入。"""
+
+    def __init__(self, path: str, title: str, streaming: bool = False):
+        self.conn = sqlite3.connect(path)
+        self.table = title or "classified"
+        self.headers: Optional[List[str]] = None
+        self.buf: List[List[Any]] = []
+
+    def append(self, row: List[Any]):
+        if self.headers is None:
+            seen: Dict[str, int] = {}
+            headers = []
+            for h in row:
+                h = str(h)
+                n = seen.get(h, 0)
+                seen[h] = n + 1
+                headers.append(h if n == 0 else f"{h}.{n}")
+            self.headers = headers
+            cols = ", ".join(f"{_quote(h)} TEXT" for h in headers)
+            self.conn.execute(f"DROP TABLE IF EXISTS {_quote(self.table)}")
+            self.conn.execute(f"CREATE TABLE {_quote(self.table)} ({cols})")
+            self.insert = f"INSERT INTO {_quote(self.table)} VALUES ({', '.join('?' * len(headers))})"
+            return
+        self.buf.append([None if v is None else str(v) for v in row])
+        if len(self.buf) >= SQLITE_BATCH_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if self.buf:
+            self.conn.executemany(self.insert, self.buf)
+            self.buf = []
+
+    def close(self):
+        if self.headers is not None:
+            self._flush()
+            self.conn.commit()
+        self.conn.close()
+
+
+READERS = {
+    "xlsx": XlsxReader,
+    "csv": CsvReader,
+    "jsonl": JsonlReader,
+    "parquet": ParquetReader,
+    "sqlite": SqliteReader,
+    "schema": SchemaReader,
+}
+
+WRITERS = {
+    "xlsx": XlsxWriter,
+    "csv": CsvWriter,
+    "jsonl": JsonlWriter,
+    "parquet": ParquetWriter,
+    "sqlite": SqliteWriter,
+}
+
+
+def open_reader(path: str, fmt: str = "", sheet_name: str = "", read_only: bool = False):
+    return READERS[detect_format(path, fmt)](path, sheet_name, read_only)
+
+
+def open_writer(path: str, fmt: str = "", title: str = "", streaming: bool = False):
+    return WRITERS[detect_format(path, fmt)](path, title, streaming)
@@ -0,0 +1,114 @@
+import os
+import sys
+import json
+import argparse
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Dict, List
+
+# 添加项目根目录到路径
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from layer4_classifier import WarmRules, classify_records
+from rules.engine import ENGINES
+from rules.regex_safety import DEFAULT_MATCH_TIMEOUT, set_match_timeout, timeout_log
+from rules.regex_backend import DEFAULT_REGEX_BACKEND, REGEX_BACKENDS, set_regex_backend
+
+
+def classify_payload(warm: WarmRules, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """处理一次批量分类请求：{"domain": ..., "records": [{field_name, field_comment, table_name, value_text}, ...]}。"""
+    domain = str(payload.get("domain") or "").strip()
+    if not domain:
+        raise ValueError("domain is required")
+    if domain != os.path.basename(domain) or domain.startswith("."):
+        raise ValueError(f"invalid domain: {domain}")
+    records = payload.get("records")
+    if not isinstance(records, list):
+        raise ValueError("records must be a list")
+    results = []
+    timeout_log.drain()
+    for res in classify_records(domain, records, warm=warm):
+        res.pop("record", None)
+        results.append(res)
+    out = {"domain": domain, "count": len(results), "results": results}
+    # 有回溯风险的正则超时（按未命中处理）的次数，便于调用方识别不完整的结果
+    _guarded, timeouts = timeout_log.drain()
+    if timeouts:
+        out["regex_timeouts"] = sum(timeouts.values())
+    return out
+
+
+def make_handler(warm: WarmRules):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code: int, body: Dict[str, Any]):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok", "domains": warm.domains()})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/classify":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                self._send(200, classify_payload(warm, payload))
+            except FileNotFoundError as e:
+                self._send(404, {"error": str(e)})
+            except (ValueError, TypeError) as e:
+                self._send(400, {"error": str(e)})
+            except Exception as e:
+                print(f"[ERROR] classify failed: {e}")
+                self._send(500, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", dest="host", default="127.0.0.1")
+    parser.add_argument("--port", dest="port", type=int, default=8765)
+    parser.add_argument("--domains", dest="domains", default="", help="comma separated domains to preload")
+    parser.add_argument("--engine", dest="engine", default="compiled", choices=sorted(ENGINES))
+    parser.add_argument("--cache-size", dest="cache_size", type=int, default=65536)
+    parser.add_argument(
+        "--regex-timeout", dest="regex_timeout", type=float, default=DEFAULT_MATCH_TIMEOUT * 1000,
+        help="per-match time limit in ms for backtracking-prone regexes, 0 to disable",
+    )
+    parser.add_argument(
+        "--regex-backend", dest="regex_backend", default=DEFAULT_REGEX_BACKEND, choices=list(REGEX_BACKENDS),
+        help="re (stdlib), re2 (linear time, needs google-re2), or auto (re2 when installed)",
+    )
+    args = parser.parse_args()
+    set_match_timeout(args.regex_timeout / 1000)
+    print(f"[INFO] Regex backend: {set_regex_backend(args.regex_backend)}")
+
+    root = os.path.dirname(os.path.dirname(__file__))
+    warm = WarmRules(root, args.engine, args.cache_size)
+    preload: List[str] = [d.strip() for d in args.domains.split(",") if d.strip()]
+    for domain in preload:
+        warm.get(domain)
+
+    # 单线程处理请求：规则执行器与记忆缓存无需加锁
+    server = HTTPServer((args.host, args.port), make_handler(warm))
+    print(f"[INFO] Serving layer4 classification on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,23 +2,26 @@ from business_rules.actions import BaseActions, rule_action
 from business_rules.fields import FIELD_TEXT, FIELD_NUMERIC
 
 
+def level_rank(lv: str) -> int:
+    """分级强弱：s1 最高（4），依次递减，无法识别为 0。"""
+    s = (lv or "").strip().lower()
+    if s.startswith("s1"):
+        return 4
+    if s.startswith("s2"):
+        return 3
+    if s.startswith("s3"):
+        return 2
+    if s.startswith("s4"):
+        return 1
+    return 0
+
+
 class ClassificationActions(BaseActions):
     def __init__(self, obj):
         self.obj = obj
 
     @rule_action(params={"level": FIELD_TEXT, "rule_id": FIELD_TEXT})
     def set_classification(self, level, rule_id):
-        def rank(lv: str) -> int:
-            s = (lv or "").strip().lower()
-            if s.startswith("s1"):
-                return 4
-            if s.startswith("s2"):
-                return 3
-            if s.startswith("s3"):
-                return 2
-            if s.startswith("s4"):
-                return 1
-            return 0
         cur = self.obj.get("result_level") or ""
         # 聚合所有触发的决策规则ID
         all_ids = self.obj.get("matched_rule_ids") or []
@@ -27,7 +30,7 @@ class ClassificationActions(BaseActions):
         self.obj["matched_rule_ids"] = all_ids
 
         # 仅在等级严格更高时覆盖最终选择
-        if rank(level) > rank(cur):
+        if level_rank(level) > level_rank(cur):
             self.obj["result_level"] = level
             self.obj["result_rule_id"] = rule_id
 
@@ -57,6 +60,24 @@ class ClassificationActions(BaseActions):
             inc = 0.0
         self.obj["score"] = cur + inc
 
+    @rule_action(params={"item": FIELD_TEXT, "value": FIELD_NUMERIC})
+    def add_item_score(self, item, value):
+        """累加到该数据项自己的分数；score 取各数据项分数中的最大值。"""
+        try:
+            inc = float(value)
+        except Exception:
+            inc = 0.0
+        scores = self.obj.get("item_scores") or {}
+        cur = float(scores.get(item, 0) or 0) + inc
+        scores[item] = cur
+        self.obj["item_scores"] = scores
+        try:
+            best = float(self.obj.get("score", 0) or 0)
+        except Exception:
+            best = 0.0
+        if cur > best:
+            self.obj["score"] = cur
+
     @rule_action(params={"tag": FIELD_TEXT})
     def add_hit(self, tag):
         hits = self.obj.get("hits") or []
@@ -0,0 +1,64 @@
+import hashlib
+import os
+import pickle
+from typing import Any, Dict, List, Optional
+
+from rules.engine import build_matchers, is_valid_rule
+
+
+# 规则包格式版本：结构或匹配器实现变化时递增，旧包自动失效
+BUNDLE_VERSION = 2
+
+RULES_JSON = "unified_rules.json"
+BUNDLE_NAME = "unified_rules.bundle"
+
+
+def source_digest(json_path: str) -> str:
+    h = hashlib.sha256()
+    with open(json_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def build_bundle(rules: List[Dict], digest: str) -> Dict[str, Any]:
+    """预编译规则包：过滤后的规则与按变量构建好的关键词自动机/正则索引。"""
+    valid = [r for r in rules if is_valid_rule(r)]
+    return {
+        "version": BUNDLE_VERSION,
+        "source_sha256": digest,
+        "rules": valid,
+        "matchers": build_matchers(valid),
+    }
+
+
+def write_bundle(rules_dir: str, rules: List[Dict]) -> str:
+    """在 unified_rules.json 旁写出规则包；须在 JSON 落盘之后调用，以记录其摘要。"""
+    bundle = build_bundle(rules, source_digest(os.path.join(rules_dir, RULES_JSON)))
+    path = os.path.join(rules_dir, BUNDLE_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(bundle, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return path
+
+
+def load_bundle(rules_dir: str) -> Optional[Dict[str, Any]]:
+    """读取规则包；不存在、版本不符或与 unified_rules.json 摘要不一致（过期）时返回 None。"""
+    path = os.path.join(rules_dir, BUNDLE_NAME)
+    json_path = os.path.join(rules_dir, RULES_JSON)
+    if not os.path.exists(path) or not os.path.exists(json_path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            bundle = pickle.load(f)
+    except Exception as e:
+        print(f"[WARN] Failed to read rules bundle {path}: {e}")
+        return None
+    if not isinstance(bundle, dict) or bundle.get("version") != BUNDLE_VERSION:
+        print(f"[WARN] Rules bundle version mismatch, falling back to JSON: {path}")
+        return None
+    if bundle.get("source_sha256") != source_digest(json_path):
+        print(f"[WARN] Rules bundle is stale, falling back to JSON: {path}")
+        return None
+    return bundle
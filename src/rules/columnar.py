@@ -0,0 +1,381 @@
+from typing import Any, Callable, Dict, List, Tuple
+
+from business_rules.operators import NumericType, StringType
+
+from rules.engine import (
+    EPSILON,
+    INDEXED_OPERATORS,
+    STATIC_VARIABLES,
+    CompiledRules,
+    _STRING_OPS,
+    _tag_leaf,
+    _to_float,
+    decision_strength,
+    iter_leaves,
+    required_tags,
+    split_rules,
+)
+from rules.actions import level_rank
+from rules.datatype import value_profile
+from rules.regex_index import compile_pattern
+from rules.variables import ITEM_SCORE_PREFIX, ClassificationVariables, item_score
+
+
+# 列式模式支持的动作：加分规则只累加分数与标签，决策规则只写结果字段
+SCORE_ACTIONS = frozenset({"add_score", "add_item_score", "add_hit"})
+DECISION_ACTIONS = frozenset({
+    "set_suggested_category", "set_classification", "set_data_marker", "set_category_rule_id", "append_audit",
+})
+
+# 决策阶段可读取的变量：静态变量 + 加分阶段结束后即固定的分数与标签
+DECISION_VARIABLES = STATIC_VARIABLES | {"score", "hit_tags"}
+
+
+def _unsupported_reason(score_rules: List[Dict], decision_rules: List[Dict]):
+    for rule in score_rules:
+        if any(a.get("name") not in SCORE_ACTIONS for a in rule.get("actions", []) or []):
+            return "score rule with non-score action"
+        for leaf in iter_leaves(rule.get("conditions") or {}):
+            if leaf.get("name") not in STATIC_VARIABLES:
+                return f"score rule reads {leaf.get('name')}"
+    for rule in decision_rules:
+        if any(a.get("name") not in DECISION_ACTIONS for a in rule.get("actions", []) or []):
+            return "decision rule with non-decision action"
+        for leaf in iter_leaves(rule.get("conditions") or {}):
+            if leaf.get("name") not in DECISION_VARIABLES and not _is_item_score(leaf.get("name")):
+                return f"decision rule reads {leaf.get('name')}"
+    for rule in score_rules + decision_rules:
+        for leaf in iter_leaves(rule.get("conditions") or {}):
+            if _leaf_kind(leaf) is None:
+                return f"unsupported condition {leaf.get('name')} {leaf.get('operator')}"
+    return None
+
+
+def _is_item_score(name: Any) -> bool:
+    return isinstance(name, str) and name.startswith(ITEM_SCORE_PREFIX)
+
+
+def _leaf_kind(cond: Dict):
+    """叶子的列式求值方式：'string' / 'numeric'；无法向量化时返回 None。"""
+    method = getattr(ClassificationVariables, str(cond.get("name")), None)
+    field_type = NumericType if _is_item_score(cond.get("name")) else getattr(method, "field_type", None)
+    op = cond.get("operator")
+    value = cond.get("value")
+    if field_type is StringType:
+        if not isinstance(value or "", str):
+            return None
+        if op == "matches_regex":
+            return "string" if compile_pattern(value or "") is not None else None
+        if op == "non_empty" or op in _STRING_OPS:
+            return "string"
+        return None
+    if field_type is NumericType:
+        if op not in ("equal_to", "greater_than", "greater_than_or_equal_to", "less_than", "less_than_or_equal_to"):
+            return None
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None
+        return "numeric"
+    return None
+
+
+class _Column:
+    """一列字符串的去重视图：每个不同取值只求值一次，再按编码映射回所有行。"""
+
+    def __init__(self, pd, values: List[str]):
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object), sort=False)
+        self.codes = codes
+        self.uniques = [str(u) for u in uniques]
+        self._found: Dict[str, Dict[str, Any]] = {}
+
+    def expand(self, np, unique_mask) -> Any:
+        return np.asarray(unique_mask, dtype=bool)[self.codes]
+
+    def found(self, np, op: str, values, profiles=None) -> Dict[str, Any]:
+        """用关键词自动机 / 正则索引对每个不同取值扫描一次，返回 值 -> 行掩码。
+
+        profiles 为每个不同取值对应的取值形态（取首次出现行的声明类型），取值符合形态时只扫描可能命中的正则。
+        """
+        got = self._found.get(op)
+        if got is None:
+            index = INDEXED_OPERATORS[op](values)
+            restrict = getattr(index, "restrict", None) if profiles is not None else None
+            per_value: Dict[str, Any] = {}
+            n = len(self.uniques)
+            for i, text in enumerate(self.uniques):
+                matcher = index
+                if restrict is not None:
+                    profile = profiles[i]
+                    if profile is not None and profile.admits(text):
+                        matcher = restrict(profile)
+                for v in matcher.find(text):
+                    m = per_value.get(v)
+                    if m is None:
+                        m = per_value[v] = np.zeros(n, dtype=bool)
+                    m[i] = True
+            got = {v: m[self.codes] for v, m in per_value.items()}
+            self._found[op] = got
+        return got
+
+
+class ColumnarRules:
+    """列式执行：整批行装入数组，每个不同的关键词/正则每列只求值一次，分数与标签按数组累加，
+    决策规则变为阈值上的数组比较；必要标签在整批中均未命中的决策规则直接跳过。
+    规则形态超出列式支持范围时整体回退到 CompiledRules。stop_first 时决策规则按结果强度排序，
+    每行只执行第一条触发的决策规则。
+    """
+
+    def __init__(self, rules: List[Dict], stop_first: bool = False):
+        try:
+            import numpy as np
+            import pandas as pd
+        except ImportError:
+            raise RuntimeError(
+                "Missing dependency pandas/numpy. Install via: pip install pandas numpy"
+            )
+        self._np = np
+        self._pd = pd
+        self.rules = rules
+        self.stop_first = stop_first
+        self.score_rules, self.decision_rules = split_rules(rules)
+        if stop_first:
+            self.decision_rules = sorted(self.decision_rules, key=decision_strength, reverse=True)
+        self.unsupported = _unsupported_reason(self.score_rules, self.decision_rules)
+        self.fallback = CompiledRules(rules, stop_first=stop_first) if self.unsupported else None
+        self.decision_tags = [required_tags(r.get("conditions") or {}) for r in self.decision_rules]
+
+        # 按变量汇总可索引的关键词/正则，供每列一次扫描
+        self.indexed: Dict[Tuple[str, str], set] = {}
+        for rule in rules:
+            for leaf in iter_leaves(rule.get("conditions") or {}):
+                op, name, value = leaf.get("operator"), leaf.get("name"), leaf.get("value")
+                if op in INDEXED_OPERATORS and name in STATIC_VARIABLES and isinstance(value or "", str):
+                    self.indexed.setdefault((op, name), set()).add(value or "")
+
+    def evaluate(self, obj: Dict) -> Dict:
+        return self.evaluate_many([obj])[0]
+
+    def evaluate_many(self, objs: List[Dict]) -> List[Dict]:
+        if self.fallback is not None:
+            return [self.fallback.evaluate(o) for o in objs]
+        if not objs:
+            return objs
+        return _Batch(self, objs).run()
+
+
+class _Batch:
+    """一批行的列式求值上下文。"""
+
+    def __init__(self, plan: ColumnarRules, objs: List[Dict]):
+        self.plan = plan
+        self.np = plan._np
+        self.pd = plan._pd
+        self.objs = objs
+        self.n = len(objs)
+        self.columns: Dict[str, _Column] = {}
+        self.leaf_cache: Dict[Tuple[str, str, str], Any] = {}
+        self.score = self.np.array([_to_float(o.get("score", 0) or 0) for o in objs], dtype=float)
+        # 数据项 -> 各行该数据项的分数；只为出现过的数据项建数组
+        self.item_scores: Dict[str, Any] = {}
+        self.item_touched: Dict[str, Any] = {}
+        self.hit_tags = None
+        self.tag_masks: Dict[str, Any] = {}
+
+    # -- 条件 --
+
+    def column(self, name: str) -> _Column:
+        col = self.columns.get(name)
+        if col is None:
+            if name == "hit_tags":
+                values = self.hit_tags
+            else:
+                values = [str(o.get(name, "")) for o in self.objs]
+            col = _Column(self.pd, values)
+            self.columns[name] = col
+        return col
+
+    def leaf(self, cond: Dict):
+        np = self.np
+        name, op, value = cond.get("name"), cond.get("operator"), cond.get("value")
+        key = (str(name), str(op), repr(value))
+        hit = self.leaf_cache.get(key)
+        if hit is not None:
+            return hit
+
+        tag = _tag_leaf(cond)
+        if tag:
+            m = self.tag_masks.get(tag)
+            if m is None:
+                m = np.zeros(self.n, dtype=bool)
+        elif name == "score" or _is_item_score(name):
+            other = float(value)
+            v = self.score if name == "score" else self.item_array(name[len(ITEM_SCORE_PREFIX):])
+            if op == "equal_to":
+                m = np.abs(v - other) <= EPSILON
+            elif op == "greater_than":
+                m = (v - other) > EPSILON
+            elif op == "greater_than_or_equal_to":
+                m = ((v - other) > EPSILON) | (np.abs(v - other) <= EPSILON)
+            elif op == "less_than":
+                m = (other - v) > EPSILON
+            else:
+                m = ((other - v) > EPSILON) | (np.abs(v - other) <= EPSILON)
+        else:
+            col = self.column(name)
+            other = value or ""
+            if (op, name) in self.plan.indexed:
+                profiles = self.value_profiles(col) if name == "value_text" else None
+                found = col.found(np, op, self.plan.indexed[(op, name)], profiles)
+                m = found.get(other)
+                if m is None:
+                    m = np.zeros(self.n, dtype=bool)
+            elif op == "matches_regex":
+                rx = compile_pattern(other)
+                m = col.expand(np, [rx.search(t) is not None for t in col.uniques])
+            elif op == "non_empty":
+                m = col.expand(np, [bool(t) for t in col.uniques])
+            else:
+                fn = _STRING_OPS[op]
+                m = col.expand(np, [fn(t, other) for t in col.uniques])
+        self.leaf_cache[key] = m
+        return m
+
+    def value_profiles(self, col: _Column):
+        """样本值列每个不同取值的取值形态；整批都没有声明类型时返回 None。"""
+        if not any(o.get("data_type") for o in self.objs):
+            return None
+        _, first = self.np.unique(col.codes, return_index=True)
+        return [value_profile(self.objs[i]) for i in first]
+
+    def item_array(self, item: str):
+        arr = self.item_scores.get(item)
+        if arr is None:
+            arr = self.np.array([item_score(o, item) for o in self.objs], dtype=float)
+            self.item_scores[item] = arr
+        return arr
+
+    def condition(self, cond: Dict):
+        np = self.np
+        keys = list(cond.keys())
+        if keys == ["all"]:
+            return np.logical_and.reduce([self.condition(c) for c in cond["all"]])
+        if keys == ["any"]:
+            return np.logical_or.reduce([self.condition(c) for c in cond["any"]])
+        return self.leaf(cond)
+
+    # -- 执行 --
+
+    def run(self) -> List[Dict]:
+        np = self.np
+        objs = self.objs
+        scored = np.zeros(self.n, dtype=bool)
+        # (行掩码, 取值) 事件按规则顺序记录，最后逐行组装列表字段
+        hit_events: List[Tuple[Any, Any]] = []
+        for rule in self.plan.score_rules:
+            m = self.condition(rule["conditions"])
+            if not m.any():
+                continue
+            for a in rule.get("actions", []) or []:
+                params = a.get("params") or {}
+                if a["name"] == "add_score":
+                    self.score = self.score + np.where(m, _to_float(params.get("value")), 0.0)
+                    scored |= m
+                elif a["name"] == "add_item_score":
+                    item = params.get("item")
+                    arr = self.item_array(item) + np.where(m, _to_float(params.get("value")), 0.0)
+                    self.item_scores[item] = arr
+                    prev = self.item_touched.get(item)
+                    self.item_touched[item] = m if prev is None else (prev | m)
+                    # 与逐行执行一致：数据项分数超过当前分数时 score 取该值
+                    raised = m & (arr > self.score)
+                    self.score = np.where(raised, arr, self.score)
+                    scored |= raised
+                else:
+                    hit_events.append((m, params.get("tag")))
+
+        hits = _assemble(np, objs, "hits", hit_events, unique=True)
+        for m, tag in hit_events:
+            if tag:
+                prev = self.tag_masks.get(tag)
+                self.tag_masks[tag] = m if prev is None else (prev | m)
+        self.hit_tags = [" ".join(str(h) for h in hs if h) if hs else "" for hs in hits]
+
+        n = self.n
+        category = np.array([o.get("category_path") for o in objs], dtype=object)
+        level = np.array([o.get("result_level") for o in objs], dtype=object)
+        rank = np.array([level_rank(o.get("result_level") or "") for o in objs], dtype=int)
+        rid = np.array([o.get("result_rule_id") for o in objs], dtype=object)
+        marker = np.array([o.get("data_marker") for o in objs], dtype=object)
+        touched = {k: np.zeros(n, dtype=bool) for k in ("category_path", "result_level", "result_rule_id", "data_marker")}
+        id_events: List[Tuple[Any, Any]] = []
+        audit_events: List[Tuple[Any, Any]] = []
+        # 命中即停：已由更强决策规则定下结果的行不再参与后续规则
+        decided = np.zeros(n, dtype=bool)
+
+        for rule, tags in zip(self.plan.decision_rules, self.plan.decision_tags):
+            if tags is not None and not any(t in self.tag_masks for t in tags):
+                continue
+            m = self.condition(rule["conditions"])
+            if self.plan.stop_first:
+                m = m & ~decided
+                decided |= m
+            if not m.any():
+                continue
+            for a in rule.get("actions", []) or []:
+                params = a.get("params") or {}
+                name = a["name"]
+                if name == "set_suggested_category":
+                    category = np.where(m, params.get("category"), category)
+                    touched["category_path"] |= m
+                elif name == "set_classification":
+                    id_events.append((m, params.get("rule_id")))
+                    upd = m & (level_rank(params.get("level")) > rank)
+                    level = np.where(upd, params.get("level"), level)
+                    rid = np.where(upd, params.get("rule_id"), rid)
+                    rank = np.where(upd, level_rank(params.get("level")), rank)
+                    touched["result_level"] |= upd
+                    touched["result_rule_id"] |= upd
+                elif name == "set_category_rule_id":
+                    rid = np.where(m, params.get("rule_id"), rid)
+                    touched["result_rule_id"] |= m
+                elif name == "set_data_marker":
+                    if params.get("marker"):
+                        marker = np.where(m, params.get("marker"), marker)
+                        touched["data_marker"] |= m
+                else:
+                    audit_events.append((m, {"citation": params.get("citation"), "source": params.get("source")}))
+
+        _assemble(np, objs, "matched_rule_ids", id_events, unique=True, skip_empty=True)
+        _assemble(np, objs, "audits", audit_events, unique=False, copy=dict)
+
+        for i in np.nonzero(scored)[0]:
+            objs[i]["score"] = float(self.score[i])
+        for item, touched_rows in self.item_touched.items():
+            arr = self.item_scores[item]
+            for i in np.nonzero(touched_rows)[0]:
+                scores = objs[i].get("item_scores") or {}
+                scores[item] = float(arr[i])
+                objs[i]["item_scores"] = scores
+        for key, arr in (("category_path", category), ("result_level", level), ("result_rule_id", rid), ("data_marker", marker)):
+            for i in np.nonzero(touched[key])[0]:
+                objs[i][key] = arr[i]
+        return objs
+
+
+def _assemble(np, objs: List[Dict], key: str, events, unique: bool, skip_empty: bool = None, copy: Callable = None):
+    """把按规则顺序记录的 (行掩码, 取值) 事件写回各行的列表字段，与逐行 append 的顺序一致。"""
+    if skip_empty is None:
+        skip_empty = unique
+    lists: Dict[int, List[Any]] = {}
+    for m, value in events:
+        for i in np.nonzero(m)[0]:
+            lst = lists.get(i)
+            if lst is None:
+                lst = lists[i] = objs[i].get(key) or []
+            if skip_empty and not value:
+                continue
+            if unique and value in lst:
+                continue
+            lst.append(copy(value) if copy else value)
+    for i, lst in lists.items():
+        objs[i][key] = lst
+    return [objs[i].get(key) or [] for i in range(len(objs))]
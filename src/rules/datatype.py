@@ -0,0 +1,148 @@
+import re
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Pattern
+
+from rules.regex_index import _length_bounds
+
+try:
+    from re import _compiler as sre_compile, _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_compile
+    import sre_parse
+
+
+_DIGITS = "0123456789"
+
+# 声明类型（去掉长度/精度后的首个单词，小写）-> (取值可能的字符, 最短长度, 最长长度)
+_TYPE_FAMILIES = (
+    (("bool", "boolean", "bit"), "01tTrRuUeEfFaAlLsSyYnNoO", 1, 5),
+    (
+        ("tinyint", "smallint", "mediumint", "int", "integer", "bigint", "int2", "int4", "int8", "serial", "bigserial"),
+        _DIGITS + "+-", 1, 20,
+    ),
+    (
+        ("decimal", "numeric", "number", "float", "double", "real", "money", "float4", "float8"),
+        _DIGITS + "+-.eE", 1, 40,
+    ),
+    (("date",), _DIGITS + "-/.年月日", 1, 12),
+    (
+        ("datetime", "datetime2", "smalldatetime", "timestamp", "timestamptz", "time", "timetz"),
+        _DIGITS + "-/.:+ TZ年月日时分秒", 1, 40,
+    ),
+)
+
+_FAMILY_BY_NAME = {
+    name: (frozenset(chars), lo, hi) for names, chars, lo, hi in _TYPE_FAMILIES for name in names
+}
+
+# 声明长度按字符数限制取值长度的类型
+_STRING_TYPES = frozenset({
+    "char", "varchar", "varchar2", "nchar", "nvarchar", "nvarchar2", "character", "string", "text",
+})
+
+_BASE_TYPE = re.compile(r"[a-z][a-z0-9_]*")
+_TYPE_LENGTH = re.compile(r"\(\s*(\d+)\s*\)")
+
+
+class TypeProfile(NamedTuple):
+    """声明类型下取值的形态：可能出现的字符（None 为不限）与长度范围 [lo, hi]（hi 为 None 为不限）。"""
+
+    alphabet: Optional[FrozenSet[str]]
+    lo: int
+    hi: Optional[int]
+
+    def admits(self, text: str) -> bool:
+        """取值是否符合该形态；不符合（类型声明与实际取值不一致）时调用方应回退到全部正则。"""
+        n = len(text)
+        if n < self.lo or (self.hi is not None and n > self.hi):
+            return False
+        return self.alphabet is None or self.alphabet.issuperset(text)
+
+    def allows(self, pat: Pattern) -> bool:
+        """正则在该形态的取值上是否可能命中：长度范围不相交，或必须出现的某个字符不在字符集合中时为否；
+        无法判断时保守地视为可能。"""
+        rlo, rhi = _length_bounds(pat)
+        if self.hi is not None and rlo > self.hi:
+            return False
+        if rhi is not None and rhi < self.lo:
+            return False
+        if self.alphabet is None:
+            return True
+        for rx in _required_chars(pat.pattern, pat.flags):
+            if not any(rx.fullmatch(ch) for ch in self.alphabet):
+                return False
+        return True
+
+
+def _to_int(v: Any) -> Optional[int]:
+    try:
+        n = int(float(str(v).strip()))
+    except Exception:
+        return None
+    return n if n > 0 else None
+
+
+@lru_cache(maxsize=4096)
+def type_profile(data_type: str, data_length: str = "") -> Optional[TypeProfile]:
+    """由声明类型（如 varchar(32)、DECIMAL(10,2)、date）与最大长度列得到取值形态；无法约束时返回 None。"""
+    s = str(data_type or "").strip().lower()
+    m = _BASE_TYPE.match(s)
+    if not m:
+        return None
+    base = m.group(0)
+    family = _FAMILY_BY_NAME.get(base)
+    if family is not None:
+        return TypeProfile(*family)
+    if base not in _STRING_TYPES:
+        return None
+    declared = _TYPE_LENGTH.search(s)
+    hi = _to_int(declared.group(1)) if declared else None
+    length = _to_int(data_length)
+    if length is not None:
+        hi = length if hi is None else min(hi, length)
+    return TypeProfile(None, 0, hi) if hi is not None else None
+
+
+def value_profile(obj: Dict[str, Any]) -> Optional[TypeProfile]:
+    dtype = obj.get("data_type")
+    if not dtype:
+        return None
+    return type_profile(dtype, obj.get("data_length") or "")
+
+
+def _required_items(items) -> List:
+    """任何一次命中都必须匹配到的单字符项（顶层序列、至少重复一次的重复体、无标志分组内）。"""
+    out = []
+    for op, av in items:
+        if op in (sre_parse.LITERAL, sre_parse.NOT_LITERAL, sre_parse.IN, sre_parse.ANY):
+            out.append((op, av))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) or op is getattr(sre_parse, "POSSESSIVE_REPEAT", None):
+            lo, _hi, sub = av
+            if lo >= 1:
+                out.extend(_required_items(list(sub)))
+        elif op is sre_parse.SUBPATTERN:
+            _group, add_flags, del_flags, sub = av
+            if not add_flags and not del_flags:
+                out.extend(_required_items(list(sub)))
+        elif op is getattr(sre_parse, "ATOMIC_GROUP", None):
+            out.extend(_required_items(list(av)))
+    return out
+
+
+@lru_cache(maxsize=None)
+def _required_chars(pattern: str, flags: int):
+    """正则必须匹配到的各单字符项，各自编译为单字符正则；解析失败时返回空（不做约束）。"""
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+        found = []
+        seen = set()
+        for item in _required_items(list(parsed)):
+            key = repr(item)
+            if key in seen:
+                continue
+            seen.add(key)
+            sub = sre_parse.SubPattern(parsed.state, [item])
+            found.append(sre_compile.compile(sub, flags))
+        return tuple(found)
+    except Exception:
+        return ()
@@ -0,0 +1,651 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from business_rules.engine import check_condition, run_all
+from business_rules.operators import NumericType, StringType
+
+from rules.variables import ITEM_SCORE_PREFIX, ClassificationVariables, item_score
+from rules.actions import ClassificationActions, level_rank
+from rules.keyword_matcher import KeywordMatcher
+from rules.regex_index import RegexIndex, compile_pattern
+from rules.datatype import value_profile
+
+
+# 与 business_rules.operators.NumericType 保持一致的比较容差
+EPSILON = 1e-6
+
+# 行内只读的变量：任何动作都不会改写，可在规则执行前一次性求值与扫描
+STATIC_VARIABLES = frozenset({
+    "field_name", "field_comment", "table_name", "field_tokens", "table_tokens", "value_text",
+})
+
+
+# 加分动作：累加全局分数或数据项分数
+SCORING_ACTIONS = frozenset({"add_score", "add_item_score"})
+
+
+def _is_score_var(name: Any) -> bool:
+    return name == "score" or (isinstance(name, str) and name.startswith(ITEM_SCORE_PREFIX))
+
+
+def _to_float(v: Any) -> float:
+    try:
+        return float(v)
+    except Exception:
+        return 0.0
+
+
+def split_rules(rules: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """按动作拆分为加分规则与决策规则；决策规则高可信（-H）优先。"""
+    score_rules = []
+    decision_rules = []
+    for rule in rules:
+        acts = rule.get("actions", []) or []
+        if any(a.get("name") in SCORING_ACTIONS for a in acts):
+            score_rules.append(rule)
+        if any(a.get("name") == "set_classification" for a in acts):
+            decision_rules.append(rule)
+
+    def _is_high(rule):
+        for a in rule.get("actions", []) or []:
+            if a.get("name") == "set_classification":
+                rid = str(a.get("params", {}).get("rule_id", ""))
+                return rid.endswith("-H")
+        return False
+
+    decision_rules.sort(key=lambda r: (not _is_high(r)))
+    return score_rules, decision_rules
+
+
+def decision_strength(rule: Dict) -> Tuple[int, int]:
+    """决策规则的结果强度：(分级强弱, 高可信为 1)；命中即停模式按此从强到弱求值。"""
+    for a in rule.get("actions", []) or []:
+        if a.get("name") == "set_classification":
+            params = a.get("params") or {}
+            return level_rank(params.get("level")), 1 if str(params.get("rule_id", "")).endswith("-H") else 0
+    return 0, 0
+
+
+def iter_leaves(cond: Dict):
+    """遍历条件树的叶子条件。"""
+    stack = [cond]
+    while stack:
+        cur = stack.pop()
+        if not isinstance(cur, dict):
+            continue
+        keys = list(cur.keys())
+        if keys == ["all"] or keys == ["any"]:
+            stack.extend(cur[keys[0]] or [])
+        else:
+            yield cur
+
+
+# 可按变量汇总后一次扫描的算子及其索引实现
+INDEXED_OPERATORS = {
+    "contains": KeywordMatcher,
+    "matches_regex": RegexIndex,
+}
+
+
+def _keyword_leaf(cond: Dict):
+    """静态变量上的 contains / matches_regex 叶子返回 ((算子, 变量名), 关键词或正则)，否则返回 None。"""
+    op = cond.get("operator")
+    if op not in INDEXED_OPERATORS or cond.get("name") not in STATIC_VARIABLES:
+        return None
+    value = cond.get("value") or ""
+    if not isinstance(value, str):
+        return None
+    return (op, cond["name"]), value
+
+
+def _keyword_alternatives(cond: Dict):
+    """条件树仅由 any/单叶子的可索引叶子组成时，返回其全部 ((算子, 变量名), 值)；否则返回 None。"""
+    keys = list(cond.keys())
+    if keys == ["any"] or (keys == ["all"] and len(cond["all"]) == 1):
+        pairs = []
+        for sub in cond[keys[0]]:
+            got = _keyword_alternatives(sub) if isinstance(sub, dict) else None
+            if got is None:
+                return None
+            pairs.extend(got)
+        return pairs or None
+    leaf = _keyword_leaf(cond)
+    return [leaf] if leaf else None
+
+
+def _tag_leaf(cond: Dict):
+    """hit_tags 上非空的 contains 叶子返回标签，否则返回 None。"""
+    if cond.get("name") != "hit_tags" or cond.get("operator") != "contains":
+        return None
+    value = cond.get("value")
+    return value if isinstance(value, str) and value else None
+
+
+def required_tags(cond: Dict):
+    """规则触发的必要条件：命中标签中至少含其中之一；无法据此判定时返回 None。"""
+    tag = _tag_leaf(cond)
+    if tag:
+        return frozenset((tag,))
+    keys = list(cond.keys())
+    if keys == ["any"]:
+        tags = set()
+        for sub in cond["any"]:
+            got = required_tags(sub) if isinstance(sub, dict) else None
+            if got is None:
+                return None
+            tags |= got
+        return frozenset(tags) or None
+    if keys == ["all"]:
+        best = None
+        for sub in cond["all"]:
+            got = required_tags(sub) if isinstance(sub, dict) else None
+            if got is not None and (best is None or len(got) < len(best)):
+                best = got
+        return best
+    return None
+
+
+def is_valid_rule(rule: Dict) -> bool:
+    """样本值正则为空或不可编译的规则视为无效，避免边缘情况误命中；编译结果进程内缓存，供执行计划复用。"""
+    for it in iter_leaves(rule.get("conditions") or {}):
+        if str(it.get("name", "")) == "value_text" and str(it.get("operator", "")) == "matches_regex":
+            if compile_pattern(str(it.get("value") or "")) is None:
+                return False
+    return True
+
+
+def build_matchers(rules: List[Dict]) -> Dict[Tuple[str, str], Any]:
+    """按 (算子, 变量名) 汇总可索引的关键词/正则，构建关键词自动机与正则索引。"""
+    keywords: Dict[Tuple[str, str], set] = {}
+    for rule in rules:
+        for leaf in iter_leaves(rule.get("conditions") or {}):
+            kv = _keyword_leaf(leaf)
+            if kv:
+                keywords.setdefault(kv[0], set()).add(kv[1])
+    return {key: INDEXED_OPERATORS[key[0]](vals) for key, vals in keywords.items()}
+
+
+def _is_static(cond: Dict) -> bool:
+    return all(leaf.get("name") in STATIC_VARIABLES for leaf in iter_leaves(cond))
+
+
+# 加分阶段只增不减的量上“一旦成立便保持成立”的算子
+_MONOTONE_SCORE_OPS = frozenset({"greater_than", "greater_than_or_equal_to"})
+
+
+def _is_monotone(cond: Dict) -> bool:
+    """条件只读静态变量、分数下限与命中标签时，加分阶段继续执行不会使其由真变假（分数与标签只增不减）。"""
+    for leaf in iter_leaves(cond):
+        name = leaf.get("name")
+        if name in STATIC_VARIABLES or _tag_leaf(leaf):
+            continue
+        if _is_score_var(name) and leaf.get("operator") in _MONOTONE_SCORE_OPS:
+            continue
+        return False
+    return True
+
+
+def score_floor(cond: Dict) -> Optional[float]:
+    """条件成立所需的最低分数（all 下的 score / item_score >= / > 叶子；score 不低于任一数据项分数）；
+    不含分数下限时返回 None。"""
+    if _is_score_var(cond.get("name")) and cond.get("operator") in _MONOTONE_SCORE_OPS:
+        value = cond.get("value")
+        return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+    keys = list(cond.keys())
+    if keys == ["all"]:
+        floors = [score_floor(c) for c in cond["all"] if isinstance(c, dict)]
+        floors = [f for f in floors if f is not None]
+        return max(floors) if floors else None
+    if keys == ["any"]:
+        floors = [score_floor(c) if isinstance(c, dict) else None for c in cond["any"]]
+        return None if any(f is None for f in floors) else min(floors)
+    return None
+
+
+class _Row:
+    """单行求值上下文：缓存变量取值，动作写入后按名失效。"""
+
+    __slots__ = ("obj", "vals", "variables", "actions", "matchers", "found_kw")
+
+    def __init__(self, obj: Dict, matchers: Dict[Tuple[str, str], Any]):
+        self.obj = obj
+        self.vals: Dict[str, Any] = {}
+        self.variables = ClassificationVariables(obj)
+        self.actions = ClassificationActions(obj)
+        self.matchers = matchers
+        self.found_kw: Dict[str, Any] = {}
+
+    def var(self, name: str) -> Any:
+        v = self.vals.get(name)
+        if v is None:
+            v = getattr(self.variables, name)()
+            self.vals[name] = v
+        return v
+
+    def hit_set(self):
+        """当前命中标签集合，按需构建，add_hit 时增量更新。"""
+        h = self.vals.get("hit_set")
+        if h is None:
+            h = set(self.obj.get("hits") or [])
+            self.vals["hit_set"] = h
+        return h
+
+    def found(self, key: Tuple[str, str]):
+        """静态变量一次扫描得到的全部命中关键词或正则；key 为 (算子, 变量名)。
+
+        样本值符合声明类型（data_type/data_length）的取值形态时，只扫描在该形态上可能命中的正则。
+        """
+        f = self.found_kw.get(key)
+        if f is None:
+            matcher = self.matchers[key]
+            text = self.var(key[1])
+            if key[1] == "value_text" and isinstance(matcher, RegexIndex):
+                profile = value_profile(self.obj)
+                if profile is not None and profile.admits(text):
+                    matcher = matcher.restrict(profile)
+            f = matcher.find(text)
+            self.found_kw[key] = f
+        return f
+
+
+_STRING_OPS: Dict[str, Callable[[str, str], bool]] = {
+    "equal_to": lambda v, o: v == o,
+    "equal_to_case_insensitive": lambda v, o: v.lower() == o.lower(),
+    "starts_with": lambda v, o: v.startswith(o),
+    "ends_with": lambda v, o: v.endswith(o),
+    "contains": lambda v, o: o in v,
+}
+
+_NUMERIC_OPS: Dict[str, Callable[[float, float], bool]] = {
+    "equal_to": lambda v, o: abs(v - o) <= EPSILON,
+    "greater_than": lambda v, o: (v - o) > EPSILON,
+    "greater_than_or_equal_to": lambda v, o: (v - o) > EPSILON or abs(v - o) <= EPSILON,
+    "less_than": lambda v, o: (o - v) > EPSILON,
+    "less_than_or_equal_to": lambda v, o: (o - v) > EPSILON or abs(v - o) <= EPSILON,
+}
+
+
+def _compile_leaf(cond: Dict, indexed: bool = True) -> Callable[[_Row], bool]:
+    kv = _keyword_leaf(cond) if indexed else None
+    if kv:
+        key, kw = kv
+        return lambda row: kw in row.found(key)
+
+    tag = _tag_leaf(cond)
+    if tag:
+        # 命中标签按集合成员判断，不再拼接字符串做子串匹配
+        return lambda row: tag in row.hit_set()
+
+    name = cond.get("name")
+    op = cond.get("operator")
+    value = cond.get("value")
+    if isinstance(name, str) and name.startswith(ITEM_SCORE_PREFIX):
+        # 数据项分数直接按标签查表
+        fn = _NUMERIC_OPS.get(op)
+        if fn is not None and not isinstance(value, bool) and isinstance(value, (int, float)):
+            item, other = name[len(ITEM_SCORE_PREFIX):], float(value)
+            return lambda row: fn(item_score(row.obj, item), other)
+        return lambda row: bool(check_condition(cond, row.variables))
+    method = getattr(ClassificationVariables, str(name), None)
+    field_type = getattr(method, "field_type", None)
+
+    def _generic(row: _Row) -> bool:
+        return bool(check_condition(cond, row.variables))
+
+    if field_type is StringType:
+        other = value or ""
+        if not isinstance(other, str):
+            return _generic
+        if op == "matches_regex":
+            rx = compile_pattern(other)
+            if rx is None:
+                return _generic
+            return lambda row: rx.search(row.var(name)) is not None
+        if op == "non_empty":
+            return lambda row: bool(row.var(name))
+        fn = _STRING_OPS.get(op)
+        if fn is None:
+            return _generic
+        return lambda row: fn(row.var(name), other)
+
+    if field_type is NumericType:
+        fn = _NUMERIC_OPS.get(op)
+        if fn is None or isinstance(value, bool) or not isinstance(value, (int, float)):
+            return _generic
+        other = float(value)
+        return lambda row: fn(row.var(name), other)
+
+    return _generic
+
+
+def compile_condition(cond: Dict, indexed: bool = True) -> Callable[[_Row], bool]:
+    """把 business_rules 条件树编译为闭包，语义与 check_conditions_recursively 一致。
+
+    indexed 为假时关键词/正则叶子各自独立匹配，不走按变量汇总的索引，便于逐条计时。
+    """
+    keys = list(cond.keys())
+    if keys == ["all"]:
+        assert len(cond["all"]) >= 1
+        subs = [compile_condition(c, indexed) for c in cond["all"]]
+
+        def _all(row: _Row) -> bool:
+            for f in subs:
+                if not f(row):
+                    return False
+            return True
+
+        return _all
+    if keys == ["any"]:
+        assert len(cond["any"]) >= 1
+        subs = [compile_condition(c, indexed) for c in cond["any"]]
+
+        def _any(row: _Row) -> bool:
+            for f in subs:
+                if f(row):
+                    return True
+            return False
+
+        return _any
+    assert not ("any" in keys or "all" in keys)
+    return _compile_leaf(cond, indexed)
+
+
+def _compile_action(action: Dict) -> Callable[[_Row], None]:
+    name = action["name"]
+    params = action.get("params") or {}
+
+    if name == "add_score":
+        inc = _to_float(params.get("value"))
+
+        def _add_score(row: _Row):
+            obj = row.obj
+            try:
+                cur = float(obj.get("score", 0) or 0)
+            except Exception:
+                cur = 0.0
+            obj["score"] = cur + inc
+            row.vals.pop("score", None)
+
+        return _add_score
+
+    if name == "add_item_score":
+        item = params.get("item")
+        inc = _to_float(params.get("value"))
+
+        def _add_item_score(row: _Row):
+            obj = row.obj
+            scores = obj.get("item_scores") or {}
+            cur = item_score(obj, item) + inc
+            scores[item] = cur
+            obj["item_scores"] = scores
+            if cur > _to_float(obj.get("score", 0) or 0):
+                obj["score"] = cur
+                row.vals.pop("score", None)
+
+        return _add_item_score
+
+    if name == "add_hit":
+        tag = params.get("tag")
+
+        def _add_hit(row: _Row):
+            obj = row.obj
+            hits = obj.get("hits") or []
+            if tag and tag not in hits:
+                hits.append(tag)
+                row.vals.pop("hit_tags", None)
+                h = row.vals.get("hit_set")
+                if h is not None:
+                    h.add(tag)
+            obj["hits"] = hits
+
+        return _add_hit
+
+    method = getattr(ClassificationActions, name, None)
+    if method is None or not getattr(method, "is_rule_action", False):
+        raise AssertionError(f"Action {name} is not defined in class ClassificationActions")
+
+    def _call(row: _Row):
+        method(row.actions, **params)
+        row.vals.clear()
+
+    return _call
+
+
+class CompiledRules:
+    """一次性编译的规则执行计划：条件树编译为闭包，规则拆分与排序只做一次。
+
+    静态变量上的 contains 关键词按变量汇总为 Aho-Corasick 自动机，matches_regex 正则按变量汇总为
+    RegexIndex，每行每个变量只扫描一次；纯关键词/正则加分规则通过“关键词或正则 -> 规则序号”倒排
+    直接触发，单行代价取决于文本长度而非规则数。决策规则按“命中标签 -> 规则序号”倒排，只求值
+    标签已在加分阶段命中的规则。
+
+    stop_first 为真时为命中即停的快速模式：决策规则按结果强度（分级、可信度）从强到弱求值，第一条触发的
+    规则即为最终结果；加分阶段按变量逐个扫描（关键词在前、正则在后），一旦最强一档的决策规则已成立，
+    或剩余变量即使全部命中也达不到任何决策规则的分数下限，即停止加分。
+    """
+
+    def __init__(
+        self,
+        rules: List[Dict],
+        matchers: Optional[Dict[Tuple[str, str], Any]] = None,
+        stop_first: bool = False,
+    ):
+        self.rules = rules
+        self.stop_first = stop_first
+        score_rules, decision_rules = split_rules(rules)
+        if stop_first:
+            # 稳定排序：同强度的决策规则保持原顺序
+            decision_rules = sorted(decision_rules, key=decision_strength, reverse=True)
+
+        # 预编译规则包中已构建好的匹配器可直接复用
+        self.matchers = matchers if matchers is not None else build_matchers(rules)
+
+        self.score_plan = [self._compile_rule(r) for r in score_rules]
+        self.decision_plan = [self._compile_rule(r) for r in decision_rules]
+
+        # 加分规则的条件都只读静态变量时，可先统一求出触发集合，再按原顺序执行动作
+        self.score_static = all(_is_static(r.get("conditions") or {}) for r in score_rules)
+        self.keyword_index: Dict[Tuple[str, str], Dict[str, List[int]]] = {}
+        self.score_residual: List[int] = []
+        for i, rule in enumerate(score_rules):
+            pairs = _keyword_alternatives(rule.get("conditions") or {}) if self.score_static else None
+            if pairs is None:
+                self.score_residual.append(i)
+                continue
+            for key, kw in pairs:
+                idx = self.keyword_index.setdefault(key, {}).setdefault(kw, [])
+                if not idx or idx[-1] != i:
+                    idx.append(i)
+
+        # 决策规则不再追加标签时，其候选集合在决策阶段开始时即可确定
+        self.decision_indexed = not any(
+            a.get("name") == "add_hit" for r in decision_rules for a in r.get("actions", []) or []
+        )
+        self.tag_index: Dict[str, List[int]] = {}
+        self.decision_always: List[int] = []
+        for i, rule in enumerate(decision_rules):
+            tags = required_tags(rule.get("conditions") or {}) if self.decision_indexed else None
+            if tags is None:
+                self.decision_always.append(i)
+                continue
+            for tag in tags:
+                self.tag_index.setdefault(tag, []).append(i)
+
+        self.fast_score = False
+        if stop_first:
+            self._plan_early_exit(score_rules, decision_rules)
+
+    def _plan_early_exit(self, score_rules: List[Dict], decision_rules: List[Dict]):
+        increments = [
+            _to_float((a.get("params") or {}).get("value"))
+            for r in score_rules for a in r.get("actions", []) or [] if a.get("name") in SCORING_ACTIONS
+        ]
+        # 加分中途停止要求分数只增不减
+        self.fast_score = self.score_static and all(v >= 0 for v in increments)
+        self.scan_order = sorted(self.keyword_index, key=lambda k: k[0] == "matches_regex")
+
+        # 每个变量的扫描最多还能带来的分数：倒排到该变量的加分规则分值之和
+        self.key_bounds: Dict[Tuple[str, str], float] = {}
+        for key, index in self.keyword_index.items():
+            ids = {i for hit in index.values() for i in hit}
+            self.key_bounds[key] = sum(
+                _to_float((a.get("params") or {}).get("value"))
+                for i in ids for a in score_rules[i].get("actions", []) or [] if a.get("name") in SCORING_ACTIONS
+            )
+        floors = [score_floor(r.get("conditions") or {}) for r in decision_rules]
+        self.min_floor = min(floors) if floors and all(f is not None for f in floors) else None
+
+        # 最强一档且条件单调的决策规则：加分中途成立后不会再失效，也不会有更强的结果
+        strengths = [decision_strength(r) for r in decision_rules]
+        top = max(strengths) if strengths else None
+        self.top_tag_index: Dict[str, List[int]] = {}
+        self.top_always: List[int] = []
+        for i, rule in enumerate(decision_rules):
+            if strengths[i] != top or not _is_monotone(rule.get("conditions") or {}):
+                continue
+            tags = required_tags(rule.get("conditions") or {})
+            if tags is None:
+                self.top_always.append(i)
+                continue
+            for tag in tags:
+                self.top_tag_index.setdefault(tag, []).append(i)
+
+    @staticmethod
+    def _compile_rule(rule: Dict):
+        cond = compile_condition(rule["conditions"])
+        acts = [_compile_action(a) for a in rule.get("actions", []) or []]
+        return cond, acts
+
+    def _run_score(self, row: _Row):
+        if self.fast_score:
+            self._run_score_fast(row)
+            return
+        plan = self.score_plan
+        if not self.score_static:
+            for cond, acts in plan:
+                if cond(row):
+                    for act in acts:
+                        act(row)
+            return
+
+        triggered = set()
+        for key, index in self.keyword_index.items():
+            for kw in row.found(key):
+                hit = index.get(kw)
+                if hit:
+                    triggered.update(hit)
+        for i in self.score_residual:
+            if plan[i][0](row):
+                triggered.add(i)
+        for i in sorted(triggered):
+            for act in plan[i][1]:
+                act(row)
+
+    def _run_score_fast(self, row: _Row):
+        plan = self.score_plan
+        for i in self.score_residual:
+            if plan[i][0](row):
+                for act in plan[i][1]:
+                    act(row)
+        remaining = sum(self.key_bounds.values())
+        done = set()
+        for n, key in enumerate(self.scan_order, 1):
+            index = self.keyword_index[key]
+            fired = set()
+            for kw in row.found(key):
+                hit = index.get(kw)
+                if hit:
+                    fired.update(hit)
+            for i in sorted(fired - done):
+                for act in plan[i][1]:
+                    act(row)
+            done |= fired
+            remaining -= self.key_bounds[key]
+            if n < len(self.scan_order) and self._settled(row, remaining):
+                return
+
+    def _settled(self, row: _Row, remaining: float) -> bool:
+        """剩余扫描已不可能让任何决策规则达到分数下限，或最强一档的决策规则已成立。"""
+        if self.min_floor is not None and row.var("score") + remaining < self.min_floor - EPSILON:
+            return True
+        candidates = set(self.top_always)
+        for tag in row.hit_set():
+            hit = self.top_tag_index.get(tag)
+            if hit:
+                candidates.update(hit)
+        plan = self.decision_plan
+        return any(plan[i][0](row) for i in sorted(candidates))
+
+    def _run_decision(self, row: _Row):
+        plan = self.decision_plan
+        if self.decision_indexed:
+            candidates = set(self.decision_always)
+            for tag in row.hit_set():
+                hit = self.tag_index.get(tag)
+                if hit:
+                    candidates.update(hit)
+            order = sorted(candidates)
+        else:
+            order = range(len(plan))
+        for i in order:
+            cond, acts = plan[i]
+            if cond(row):
+                for act in acts:
+                    act(row)
+                if self.stop_first:
+                    return
+
+    def evaluate(self, obj: Dict) -> Dict:
+        row = _Row(obj, self.matchers)
+        self._run_score(row)
+        self._run_decision(row)
+        return obj
+
+
+class InterpretedRules:
+    """逐行调用 business_rules.run_all 的解释执行，用于对照与回归；stop_first 时决策规则按结果强度排序、
+    触发第一条即停（stop_on_first_trigger），加分规则仍全部执行。"""
+
+    def __init__(self, rules: List[Dict], stop_first: bool = False):
+        self.rules = rules
+        self.stop_first = stop_first
+        self.score_rules, self.decision_rules = split_rules(rules)
+        if stop_first:
+            self.decision_rules = sorted(self.decision_rules, key=decision_strength, reverse=True)
+
+    def evaluate(self, obj: Dict) -> Dict:
+        vars_obj = ClassificationVariables(obj)
+        acts_obj = ClassificationActions(obj)
+        for rule_list, stop in ((self.score_rules, False), (self.decision_rules, self.stop_first)):
+            run_all(
+                rule_list=rule_list,
+                defined_variables=vars_obj,
+                defined_actions=acts_obj,
+                stop_on_first_trigger=stop,
+            )
+        return obj
+
+
+def _columnar(rules: List[Dict], stop_first: bool = False):
+    # 列式执行依赖 pandas/numpy，按需导入
+    from rules.columnar import ColumnarRules
+    return ColumnarRules(rules, stop_first)
+
+
+ENGINES = {
+    "compiled": CompiledRules,
+    "business_rules": InterpretedRules,
+    "columnar": _columnar,
+}
+
+
+def build_engine(
+    rules: List[Dict],
+    kind: str = "compiled",
+    matchers: Optional[Dict[Tuple[str, str], Any]] = None,
+    stop_first: bool = False,
+):
+    if kind not in ENGINES:
+        raise ValueError(f"unknown engine: {kind}")
+    if kind == "compiled" and matchers is not None:
+        return CompiledRules(rules, matchers=matchers, stop_first=stop_first)
+    return ENGINES[kind](rules, stop_first=stop_first)
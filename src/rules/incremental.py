@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# 指纹文件格式版本：字段或指纹算法变化时递增，旧文件自动失效
+SIDECAR_VERSION = 2
+
+SIDECAR_SUFFIX = ".fingerprints.sqlite"
+
+# 版本 1 的 JSON 指纹文件后缀；传入时改读同名的 SQLite 指纹文件
+_LEGACY_SUFFIX = ".fingerprints.json"
+
+# 单条 SQL 中 IN (...) 的参数个数上限，兼容旧版 SQLite 的 999 变量限制
+_QUERY_CHUNK = 500
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS results (fp TEXT PRIMARY KEY, result TEXT NOT NULL)",
+)
+
+# 决定分类结果的行输入字段；分词由字段名/表名派生，不单独计入
+ROW_FIELDS = ("field_name", "field_comment", "table_name", "value_text")
+
+
+def ruleset_digest(rules: List[Dict], options: Optional[Dict[str, Any]] = None) -> str:
+    """规则集版本哈希：对加载后的有效规则做规范化 JSON 摘要，与规则来自 JSON 还是规则包无关；
+    options 为改变结果语义的运行选项（如命中即停），非空时一并计入。"""
+    payload = {"rules": rules, "options": options} if options else rules
+    text = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def row_fingerprint(obj: Dict[str, Any]) -> str:
+    text = json.dumps([str(obj.get(f, "") or "") for f in ROW_FIELDS], ensure_ascii=False)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def sidecar_path(path: str) -> str:
+    """输出文件对应的指纹文件（<file>.classified.fingerprints.sqlite）；传入指纹文件本身时原样返回。"""
+    if path.endswith(SIDECAR_SUFFIX):
+        return path
+    if path.endswith(_LEGACY_SUFFIX):
+        return path[: -len(_LEGACY_SUFFIX)] + SIDECAR_SUFFIX
+    return os.path.splitext(path)[0] + SIDECAR_SUFFIX
+
+
+class PreviousResults:
+    """上次运行的指纹文件（SQLite，按指纹建主键），按块查询，不整体载入内存。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+
+    def meta(self) -> Dict[str, str]:
+        return dict(self.conn.execute("SELECT key, value FROM meta"))
+
+    def get_many(self, fps: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        keys = list(dict.fromkeys(fps))
+        found: Dict[str, Dict[str, Any]] = {}
+        for i in range(0, len(keys), _QUERY_CHUNK):
+            chunk = keys[i:i + _QUERY_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            cur = self.conn.execute(f"SELECT fp, result FROM results WHERE fp IN ({marks})", chunk)
+            for fp, result in cur:
+                found[fp] = json.loads(result)
+        return found
+
+    def close(self):
+        self.conn.close()
+
+
+def load_previous(path: str, digest: str) -> Optional[PreviousResults]:
+    """打开上次运行的 指纹 -> 结果摘要；文件缺失、版本不符或规则集哈希不同时返回 None（全量重算）。"""
+    path = sidecar_path(path)
+    if not os.path.exists(path):
+        print(f"[INFO] No previous fingerprints at {path}, classifying all rows")
+        return None
+    previous = PreviousResults(path)
+    try:
+        meta = previous.meta()
+    except Exception as e:
+        print(f"[WARN] Failed to read previous fingerprints {path}: {e}")
+        previous.close()
+        return None
+    if meta.get("version") != str(SIDECAR_VERSION):
+        print(f"[WARN] Fingerprint file version mismatch, classifying all rows: {path}")
+        previous.close()
+        return None
+    if meta.get("ruleset_sha256") != digest:
+        print(f"[INFO] Ruleset changed since previous run, classifying all rows: {path}")
+        previous.close()
+        return None
+    return previous
+
+
+class FingerprintLog:
+    """按块写出本次运行每个行指纹的结果摘要（不含原始行）供下次增量运行复用。
+
+    先写入同目录的临时库，close 时再替换指纹文件，因此可与上次的同名指纹文件同时打开；
+    运行失败时 discard 删除临时库，保留上次的指纹文件。
+    """
+
+    def __init__(self, path: str, digest: str):
+        self.path = sidecar_path(path)
+        self.tmp = self.path + ".tmp"
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if os.path.exists(self.tmp):
+            os.remove(self.tmp)
+        self.conn = sqlite3.connect(self.tmp)
+        self.conn.execute("PRAGMA journal_mode=OFF")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        with self.conn:
+            for stmt in _SCHEMA:
+                self.conn.execute(stmt)
+            self.conn.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                [("version", str(SIDECAR_VERSION)), ("ruleset_sha256", digest)],
+            )
+
+    def add_many(self, items: List[Tuple[str, Dict[str, Any]]]):
+        if not items:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO results (fp, result) VALUES (?, ?)",
+                [
+                    (fp, json.dumps({k: v for k, v in p.items() if k != "row"}, ensure_ascii=False, default=str))
+                    for fp, p in items
+                ],
+            )
+
+    def close(self) -> str:
+        self.conn.close()
+        os.replace(self.tmp, self.path)
+        return self.path
+
+    def discard(self):
+        self.conn.close()
+        if os.path.exists(self.tmp):
+            os.remove(self.tmp)
@@ -0,0 +1,66 @@
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+
+class KeywordMatcher:
+    """Aho-Corasick 多关键词自动机：一次扫描找出文本中出现的全部关键词（子串语义）。"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = sorted({k for k in keywords if isinstance(k, str)})
+        # 空串在任何文本中都“包含”，单独记录
+        self.always: FrozenSet[str] = frozenset(k for k in self.keywords if not k)
+        goto: List[Dict[str, int]] = [{}]
+        out: List[Tuple[str, ...]] = [()]
+        for kw in self.keywords:
+            if not kw:
+                continue
+            s = 0
+            for ch in kw:
+                nxt = goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[s][ch] = nxt
+                    goto.append({})
+                    out.append(())
+                s = nxt
+            out[s] = out[s] + (kw,)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            s = queue.popleft()
+            for ch, t in goto[s].items():
+                queue.append(t)
+                f = fail[s]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                nxt = goto[f].get(ch, 0)
+                fail[t] = nxt if nxt != t else 0
+                out[t] = out[t] + out[fail[t]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def find(self, text: str) -> FrozenSet[str]:
+        """返回 text 中出现过的全部关键词。"""
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        found = set(self.always)
+        s = 0
+        for ch in text or "":
+            while True:
+                nxt = goto[s].get(ch)
+                if nxt is not None:
+                    s = nxt
+                    break
+                if s == 0:
+                    break
+                s = fail[s]
+            if out[s]:
+                found.update(out[s])
+        return frozenset(found)
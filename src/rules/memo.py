@@ -0,0 +1,74 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+from rules.engine import iter_leaves
+
+
+# 派生变量与其来源字段：field_tokens 由 field_name 生成，table_tokens 由 table_name 生成
+_DERIVED_SOURCES = {
+    "field_tokens": "field_name",
+    "table_tokens": "table_name",
+}
+
+# 初值可能不同、且会被规则读取的行字段；不被任何规则引用的字段不进入指纹
+_INPUT_FIELDS = ("field_name", "field_comment", "table_name", "value_text", "category_path", "score")
+
+_MISSING = object()
+
+
+def fingerprint_fields(rules: List[Dict]) -> Tuple[str, ...]:
+    """返回决定规则结果的行字段：规则条件实际读取的输入字段（派生变量折算为来源字段）。"""
+    used = set()
+    for rule in rules:
+        for leaf in iter_leaves(rule.get("conditions") or {}):
+            name = str(leaf.get("name", ""))
+            used.add(_DERIVED_SOURCES.get(name, name))
+    # score/category_path 会被动作改写，初值仍参与指纹以保证结果一致
+    used.update(("category_path", "score"))
+    return tuple(f for f in _INPUT_FIELDS if f in used)
+
+
+class MemoizedRules:
+    """按行指纹记忆结果的执行器：相同输入组合只求值一次，LRU 限定条目数并统计命中率。"""
+
+    def __init__(self, engine, max_size: int = 65536):
+        self.engine = engine
+        self.rules = engine.rules
+        self.max_size = max_size
+        self.fields = fingerprint_fields(engine.rules)
+        self._cache: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def fingerprint(self, obj: Dict) -> Tuple:
+        return tuple(str(obj.get(f, "") or "") for f in self.fields)
+
+    def evaluate(self, obj: Dict) -> Dict:
+        key = self.fingerprint(obj)
+        delta = self._cache.get(key)
+        if delta is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            obj.update({k: (list(v) if isinstance(v, list) else v) for k, v in delta.items()})
+            return obj
+
+        self.misses += 1
+        before = dict(obj)
+        obj = self.engine.evaluate(obj)
+        # 只记录求值写入或改动的字段，命中时叠加到新行上
+        delta = {k: v for k, v in obj.items() if before.get(k, _MISSING) != v}
+        delta = {k: (list(v) if isinstance(v, list) else v) for k, v in delta.items()}
+        if self.max_size > 0:
+            self._cache[key] = delta
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return obj
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._cache),
+            "hit_ratio": (self.hits / total) if total > 0 else 0.0,
+        }
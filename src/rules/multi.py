@@ -0,0 +1,68 @@
+from typing import Any, Dict, List
+
+from rules.engine import STATIC_VARIABLES, CompiledRules, _Row, build_matchers
+
+
+# 每个领域写回的结果字段
+RESULT_FIELDS = ("category_path", "result_level", "result_rule_id", "data_marker", "hits", "audits", "score")
+
+
+def _confidence_rank(rid: str) -> int:
+    # 决策规则ID以 -H/-M 结尾，分别对应高/中可信
+    rid = str(rid or "")
+    if rid.endswith("-H"):
+        return 2
+    if rid.endswith("-M"):
+        return 1
+    return 0
+
+
+def best_domain(results: Dict[str, Dict[str, Any]]) -> str:
+    """按可信度、再按得分选出最佳领域；并列时取先给出的领域。"""
+    best, best_key = "", None
+    for domain, res in results.items():
+        try:
+            score = float(res.get("score", 0) or 0)
+        except (TypeError, ValueError):
+            score = 0.0
+        key = (_confidence_rank(res.get("result_rule_id", "")), score)
+        if best_key is None or key > best_key:
+            best, best_key = domain, key
+    return best
+
+
+class MultiDomainRules:
+    """多领域一次求值：各领域规则中的关键词/正则按 (算子, 变量) 合并为一套匹配器，每行的静态变量
+    与关键词/正则扫描只做一次，由各领域共享，再分别执行各自的加分与决策规则。
+
+    evaluate 把各领域结果写入 obj["domain_results"]，并把最佳领域的结果字段写回 obj 顶层、
+    领域名写入 obj["domain"]，因此可直接叠加行指纹记忆与多进程。primary 非空时顶层固定取该规则集的
+    结果（影子对比时为现行规则）。
+    """
+
+    def __init__(self, rulesets: Dict[str, List[Dict]], primary: str = "", stop_first: bool = False):
+        self.domains = list(rulesets)
+        self.primary = primary
+        self.rules = [r for rules in rulesets.values() for r in rules]
+        # 合并后的匹配器返回各领域关键词的并集，各领域倒排只取自己的关键词
+        self.matchers = build_matchers(self.rules)
+        self.engines = {d: CompiledRules(rules, self.matchers, stop_first) for d, rules in rulesets.items()}
+
+    def evaluate(self, obj: Dict) -> Dict:
+        found: Dict[Any, Any] = {}
+        static: Dict[str, Any] = {}
+        results: Dict[str, Dict[str, Any]] = {}
+        for domain, engine in self.engines.items():
+            o = dict(obj)
+            row = _Row(o, self.matchers)
+            row.found_kw = found
+            row.vals.update(static)
+            engine._run_score(row)
+            engine._run_decision(row)
+            static.update((k, v) for k, v in row.vals.items() if k in STATIC_VARIABLES)
+            results[domain] = {k: o[k] for k in RESULT_FIELDS if k in o}
+        best = self.primary or best_domain(results)
+        obj.update(results[best])
+        obj["domain"] = best
+        obj["domain_results"] = results
+        return obj
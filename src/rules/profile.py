@@ -0,0 +1,148 @@
+import csv
+import json
+import time
+from typing import Any, Dict, List
+
+from rules.engine import _Row, _compile_action, compile_condition, split_rules
+
+
+# Layer 3 生成的加分规则类型标签
+SCORE_TYPES = ("KW_EN", "GEN_EN", "KW_CN", "VAL_KW", "VAL_RX")
+
+# 判断规则是否“影响”行结果时比较的字段
+_OUTCOME_FIELDS = ("score", "category_path", "result_level", "result_rule_id", "data_marker")
+
+REPORT_COLUMNS = [
+    "index", "phase", "type", "item", "condition", "evaluations", "time_ms", "triggers", "rows_affected",
+]
+
+
+def rule_type(rule: Dict, phase: str) -> str:
+    """规则类型：加分规则取类型标签（KW_EN/GEN_EN/...），决策规则按规则ID后缀取 -H/-M。"""
+    acts = rule.get("actions", []) or []
+    if phase == "decision":
+        for a in acts:
+            if a.get("name") == "set_classification":
+                rid = str((a.get("params") or {}).get("rule_id", ""))
+                for suffix in ("-H", "-M"):
+                    if rid.endswith(suffix):
+                        return f"decision{suffix}"
+        return "decision"
+    for a in acts:
+        tag = (a.get("params") or {}).get("tag") if a.get("name") == "add_hit" else None
+        if tag in SCORE_TYPES:
+            return tag
+    return "score"
+
+
+def _rule_item(rule: Dict) -> str:
+    for a in rule.get("actions", []) or []:
+        params = a.get("params") or {}
+        if a.get("name") == "set_classification":
+            return str(params.get("rule_id", ""))
+        if a.get("name") == "add_hit" and params.get("tag") not in SCORE_TYPES:
+            return str(params.get("tag", ""))
+    return ""
+
+
+def _describe(cond: Dict) -> str:
+    keys = list(cond.keys())
+    if keys == ["all"] or keys == ["any"]:
+        parts = [_describe(c) for c in cond[keys[0]] if isinstance(c, dict)]
+        return parts[0] if len(parts) == 1 else f"{keys[0]}(" + "; ".join(parts) + ")"
+    return f"{cond.get('name')} {cond.get('operator')} {cond.get('value')}"
+
+
+def _outcome(obj: Dict):
+    hits = obj.get("hits") or []
+    # 数据项分数低于当前最高分时不改变 score，需单独比较才能算作“影响”了行结果
+    item_scores = tuple(sorted((obj.get("item_scores") or {}).items()))
+    return tuple(obj.get(k) for k in _OUTCOME_FIELDS) + (item_scores, len(hits))
+
+
+class _Stat:
+    __slots__ = ("evaluations", "seconds", "triggers", "rows_affected")
+
+    def __init__(self):
+        self.evaluations = 0
+        self.seconds = 0.0
+        self.triggers = 0
+        self.rows_affected = 0
+
+
+class ProfiledRules:
+    """逐条计时的执行器：规则按原顺序逐条求值（不走关键词/正则汇总索引），记录每条规则的
+    求值次数、累计耗时、触发次数与实际改变行结果的次数，用于剪除从不触发的规则、定位慢正则。
+    """
+
+    def __init__(self, rules: List[Dict]):
+        self.rules = rules
+        index = {id(r): i for i, r in enumerate(rules)}
+        score_rules, decision_rules = split_rules(rules)
+        self.plan = []
+        for phase, rule_list in (("score", score_rules), ("decision", decision_rules)):
+            for rule in rule_list:
+                cond = compile_condition(rule["conditions"], indexed=False)
+                acts = [_compile_action(a) for a in rule.get("actions", []) or []]
+                self.plan.append((index[id(rule)], phase, rule, cond, acts, _Stat()))
+
+    def evaluate(self, obj: Dict) -> Dict:
+        row = _Row(obj, {})
+        clock = time.perf_counter
+        for _, _, _, cond, acts, stat in self.plan:
+            t0 = clock()
+            fired = cond(row)
+            stat.seconds += clock() - t0
+            stat.evaluations += 1
+            if not fired:
+                continue
+            stat.triggers += 1
+            before = _outcome(obj)
+            for act in acts:
+                act(row)
+            if _outcome(obj) != before:
+                stat.rows_affected += 1
+        return obj
+
+    def report(self) -> Dict[str, Any]:
+        rows = []
+        groups: Dict[str, Dict[str, Any]] = {}
+        for i, phase, rule, _, _, stat in self.plan:
+            typ = rule_type(rule, phase)
+            rows.append({
+                "index": i,
+                "phase": phase,
+                "type": typ,
+                "item": _rule_item(rule),
+                "condition": _describe(rule.get("conditions") or {}),
+                "evaluations": stat.evaluations,
+                "time_ms": round(stat.seconds * 1000, 3),
+                "triggers": stat.triggers,
+                "rows_affected": stat.rows_affected,
+            })
+            g = groups.setdefault(typ, {
+                "rules": 0, "never_triggered": 0, "evaluations": 0, "time_ms": 0.0, "triggers": 0, "rows_affected": 0,
+            })
+            g["rules"] += 1
+            g["never_triggered"] += 1 if stat.triggers == 0 else 0
+            g["evaluations"] += stat.evaluations
+            g["time_ms"] += stat.seconds * 1000
+            g["triggers"] += stat.triggers
+            g["rows_affected"] += stat.rows_affected
+        for g in groups.values():
+            g["time_ms"] = round(g["time_ms"], 3)
+        rows.sort(key=lambda r: r["time_ms"], reverse=True)
+        return {"groups": groups, "rules": rows}
+
+    def write_report(self, base_path: str):
+        """写出 <base>.profile.json（分组汇总 + 逐条明细）与 <base>.profile.csv（逐条明细，按耗时降序）。"""
+        rep = self.report()
+        json_path = base_path + ".profile.json"
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(rep, f, ensure_ascii=False, indent=2)
+        csv_path = base_path + ".profile.csv"
+        with open(csv_path, "w", encoding="utf-8-sig", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=REPORT_COLUMNS)
+            w.writeheader()
+            w.writerows(rep["rules"])
+        return json_path, csv_path
@@ -0,0 +1,312 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse
+
+
+# 正则执行后端：re 为标准库（回溯）；re2 为线性时间的 RE2（pip install google-re2），不支持的正则逐条回退到 re；
+# auto 在 RE2 可用时使用 re2，否则 re
+REGEX_BACKENDS = ("re", "re2", "auto")
+DEFAULT_REGEX_BACKEND = "re"
+
+# RE2 单个重复计数的上限，超过则无法编译
+_RE2_MAX_REPEAT = 1000
+
+# 每个 RE2 集合最多合并的正则数：集合过大时 DFA 状态数膨胀、缓存反复重建，反而比分块扫描慢
+RE2_SET_CHUNK = 256
+
+_MAXREPEAT = sre_parse.MAXREPEAT
+
+# 与 re 的 Unicode 语义不同、只在 ASCII 文本上一致的项
+_ASCII_CATEGORIES = {
+    sre_parse.CATEGORY_WORD: r"\w",
+    sre_parse.CATEGORY_NOT_WORD: r"\W",
+}
+
+# re 在 str 上的 \s 对 ASCII 字符即 str.isspace()：比 RE2 的 \s 多 \v 与 \x1c-\x1f
+_SPACE = r"\t\n\x{b}\f\r \x{1c}-\x{1f}"
+
+_INLINE_FLAGS = {re.IGNORECASE: "i", re.MULTILINE: "m", re.DOTALL: "s"}
+# 解析阶段已生效、不影响匹配语义的标志
+_PARSE_FLAGS = re.UNICODE | re.VERBOSE
+
+
+class Unsupported(Exception):
+    pass
+
+
+def _lit(c: int) -> str:
+    ch = chr(c)
+    if ch.isascii() and ch.isalnum():
+        return ch
+    return "\\x{%x}" % c
+
+
+class _Translator:
+    """把 re 的解析树改写为语义相同的 RE2 语法：分组一律改为非捕获，\\d 改为 \\p{Nd}；
+    只在 ASCII 文本上一致的项（\\w、\\s、\\b、忽略大小写）与 $（re 可匹配结尾换行之前）记录下来，
+    由执行时按取值回退。"""
+
+    def __init__(self):
+        self.ascii_only = False
+        self.at_end = False
+
+    def seq(self, items) -> str:
+        return "".join(self.item(op, av) for op, av in items)
+
+    def item(self, op, av) -> str:
+        if op is sre_parse.LITERAL:
+            return _lit(av)
+        if op is sre_parse.NOT_LITERAL:
+            return f"[^{_lit(av)}]"
+        if op is sre_parse.ANY:
+            return "."
+        if op is sre_parse.IN:
+            return self.charset(av)
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            lo, hi, body = av
+            if lo > _RE2_MAX_REPEAT or (hi != _MAXREPEAT and hi > _RE2_MAX_REPEAT):
+                raise Unsupported("repeat count over 1000")
+            if hi == _MAXREPEAT:
+                q = "*" if lo == 0 else "+" if lo == 1 else f"{{{lo},}}"
+            elif (lo, hi) == (0, 1):
+                q = "?"
+            else:
+                q = f"{{{lo}}}" if lo == hi else f"{{{lo},{hi}}}"
+            lazy = "?" if op is sre_parse.MIN_REPEAT else ""
+            return f"(?:{self.seq(body)}){q}{lazy}"
+        if op is sre_parse.SUBPATTERN:
+            _group, add_flags, del_flags, body = av
+            return f"(?{self.flags(add_flags, del_flags)}:{self.seq(body)})"
+        if op is sre_parse.BRANCH:
+            return "(?:" + "|".join(self.seq(alt) for alt in av[1]) + ")"
+        if op is sre_parse.AT:
+            return self.at(av)
+        raise Unsupported(str(op).lower())
+
+    def flags(self, add_flags: int, del_flags: int) -> str:
+        out = []
+        for flags, sign in ((add_flags, ""), (del_flags, "-")):
+            flags &= ~_PARSE_FLAGS
+            chars = "".join(ch for flag, ch in _INLINE_FLAGS.items() if flags & flag)
+            if flags & ~sum(_INLINE_FLAGS):
+                raise Unsupported("inline flag")
+            if flags & re.IGNORECASE:
+                self.ascii_only = True
+            if chars:
+                out.append(sign + chars)
+        return "".join(out)
+
+    def at(self, code) -> str:
+        if code is sre_parse.AT_BEGINNING:
+            return "^"
+        if code is sre_parse.AT_END:
+            self.at_end = True
+            return "$"
+        if code is sre_parse.AT_BEGINNING_STRING:
+            return r"\A"
+        if code is sre_parse.AT_END_STRING:
+            return r"\z"
+        if code in (sre_parse.AT_BOUNDARY, sre_parse.AT_NON_BOUNDARY):
+            self.ascii_only = True
+            return r"\b" if code is sre_parse.AT_BOUNDARY else r"\B"
+        raise Unsupported(str(code).lower())
+
+    def charset(self, items) -> str:
+        items = list(items)
+        negate = bool(items) and items[0][0] is sre_parse.NEGATE
+        if negate:
+            items = items[1:]
+        if items == [(sre_parse.CATEGORY, sre_parse.CATEGORY_NOT_SPACE)]:
+            # \S 无法并入其他字符集合，单独出现时取反
+            self.ascii_only = True
+            return f"[{_SPACE}]" if negate else f"[^{_SPACE}]"
+        parts = []
+        for op, av in items:
+            if op is sre_parse.LITERAL:
+                parts.append(_lit(av))
+            elif op is sre_parse.RANGE:
+                parts.append(f"{_lit(av[0])}-{_lit(av[1])}")
+            elif op is sre_parse.CATEGORY and av is sre_parse.CATEGORY_DIGIT:
+                parts.append(r"\p{Nd}")
+            elif op is sre_parse.CATEGORY and av is sre_parse.CATEGORY_NOT_DIGIT:
+                parts.append(r"\P{Nd}")
+            elif op is sre_parse.CATEGORY and av is sre_parse.CATEGORY_SPACE:
+                self.ascii_only = True
+                parts.append(_SPACE)
+            elif op is sre_parse.CATEGORY and av in _ASCII_CATEGORIES:
+                self.ascii_only = True
+                parts.append(_ASCII_CATEGORIES[av])
+            else:
+                raise Unsupported("character class")
+        return ("[^" if negate else "[") + "".join(parts) + "]"
+
+
+def to_re2(pattern: str, flags: int) -> Tuple[str, bool, bool]:
+    """re 正则改写为 RE2 语法，返回 (改写后的正则, 是否只在 ASCII 文本上与 re 一致, 是否含 $)；
+    含 RE2 不支持的结构（反向引用、环视、原子组等）时抛出 Unsupported。"""
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except Exception as e:
+        raise Unsupported(f"parse error: {e}")
+    t = _Translator()
+    prefix = t.flags(parsed.state.flags & ~re.UNICODE, 0)
+    body = t.seq(list(parsed))
+    return (f"(?{prefix})" if prefix else "") + body, t.ascii_only, t.at_end
+
+
+class Re2Pattern:
+    """RE2 执行的正则，属性与 re.Pattern 一致（供长度/类型预判使用 pattern、flags）。取值超出 RE2 与 re 语义
+    一致的范围时（非 ASCII 文本遇 \\w 等、结尾换行遇 $、无法编码为 UTF-8）改用原 re 正则。"""
+
+    def __init__(self, compiled, source: str, fallback: Any, ascii_only: bool, at_end: bool):
+        self.compiled = compiled
+        # 改写后的 RE2 正则，供合并为集合
+        self.source = source
+        self.fallback = fallback
+        self.pattern = fallback.pattern
+        self.flags = fallback.flags
+        self.groups = fallback.groups
+        self.ascii_only = ascii_only
+        self.at_end = at_end
+
+    def applies(self, text: str) -> bool:
+        if self.ascii_only and not text.isascii():
+            return False
+        return not (self.at_end and text.endswith("\n"))
+
+    def search(self, text: str, *args):
+        if args or not self.applies(text):
+            return self.fallback.search(text, *args)
+        try:
+            return self.compiled.search(text)
+        except UnicodeEncodeError:
+            return self.fallback.search(text)
+
+    def fullmatch(self, text: str, *args):
+        return self.fallback.fullmatch(text, *args)
+
+
+class Re2Set:
+    """RE2 多模式集合：每块一次扫描得到文本上命中的全部原生正则。find 返回 (命中的正则, 本文本上须逐条用 re 检查的条目)。"""
+
+    def __init__(self, chunks: List[Tuple[Any, List[Tuple[Any, ...]]]]):
+        self.chunks = chunks
+        self.entries = [e for _matcher, entries in chunks for e in entries]
+        self.ascii_entries = [e for e in self.entries if e[1].ascii_only]
+        self.end_entries = [e for e in self.entries if e[1].at_end]
+
+    def find(self, text: str) -> Optional[Tuple[List[str], List[Tuple[Any, ...]]]]:
+        hits = []
+        try:
+            for matcher, entries in self.chunks:
+                for i in matcher.Match(text) or ():
+                    hits.append(entries[i])
+        except UnicodeEncodeError:
+            return None
+        nonascii, newline = not text.isascii(), text.endswith("\n")
+        if not nonascii and not newline:
+            return [e[0] for e in hits], []
+        found = [e[0] for e in hits if e[1].applies(text)]
+        pending = self.ascii_entries if nonascii else []
+        if newline:
+            pending = pending + [e for e in self.end_entries if not (nonascii and e[1].ascii_only)]
+        return found, pending
+
+
+class RegexBackendLog:
+    """非 re 后端下回退到 re 的正则及原因，供启动检查汇总。"""
+
+    def __init__(self):
+        self.fallback: Dict[str, str] = {}
+
+
+backend_log = RegexBackendLog()
+
+_settings: Dict[str, Any] = {"backend": DEFAULT_REGEX_BACKEND, "module": None, "options": None}
+
+
+def _load_re2():
+    try:
+        import re2  # type: ignore
+    except ImportError:
+        raise RuntimeError("Missing dependency google-re2. Install via: pip install google-re2")
+    return re2
+
+
+def set_regex_backend(name: str) -> str:
+    """选择正则后端，返回实际使用的后端名（auto 在 RE2 不可用时为 re）。须在编译规则之前调用。"""
+    if name not in REGEX_BACKENDS:
+        raise ValueError(f"unknown regex backend: {name}")
+    module = None
+    if name != "re":
+        try:
+            module = _load_re2()
+        except RuntimeError:
+            if name == "re2":
+                raise
+            name = "re"
+        else:
+            name = "re2"
+    _settings["backend"] = name
+    _settings["module"] = module
+    _settings["options"] = None
+    if module is not None:
+        options = module.Options()
+        # 不支持的正则按预期回退，不向 stderr 打印 RE2 的解析错误
+        options.log_errors = False
+        _settings["options"] = options
+    return name
+
+
+def get_regex_backend() -> str:
+    return _settings["backend"]
+
+
+def native_pattern(pat: Any) -> Any:
+    """按当前后端包装已编译的 re 正则：re2 下可改写的正则返回 Re2Pattern，其余原样返回并记录回退原因。"""
+    module = _settings["module"]
+    if module is None or pat is None:
+        return pat
+    rx = pat.pattern
+    try:
+        translated, ascii_only, at_end = to_re2(rx, pat.flags)
+        compiled = module.compile(translated, _settings["options"])
+    except Unsupported as e:
+        backend_log.fallback[rx] = str(e)
+        return pat
+    except Exception as e:
+        backend_log.fallback[rx] = f"re2: {e}"
+        return pat
+    return Re2Pattern(compiled, translated, pat, ascii_only, at_end)
+
+
+def _compile_chunks(module, entries: List[Tuple[Any, ...]]) -> List[Tuple[Any, List[Tuple[Any, ...]]]]:
+    """每块构建一个 RE2 集合；超出 RE2 内存上限无法编译时对半拆分，单条仍无法加入集合的正则留给逐条匹配。"""
+    try:
+        matcher = module.Set.SearchSet(_settings["options"])
+        for e in entries:
+            matcher.Add(e[1].source)
+        matcher.Compile()
+        return [(matcher, entries)]
+    except Exception:
+        if len(entries) <= 1:
+            return []
+        mid = len(entries) // 2
+        return _compile_chunks(module, entries[:mid]) + _compile_chunks(module, entries[mid:])
+
+
+def pattern_set(entries: List[Tuple[Any, ...]]) -> Optional[Re2Set]:
+    """entries 为 (正则原文, 已编译正则, ...)：其中的 Re2Pattern 按每块 RE2_SET_CHUNK 条合并为 RE2 集合；
+    不足两条或无法构建时返回 None。"""
+    module = _settings["module"]
+    native = [e for e in entries if isinstance(e[1], Re2Pattern)]
+    if module is None or len(native) < 2:
+        return None
+    chunks = []
+    for i in range(0, len(native), RE2_SET_CHUNK):
+        chunks.extend(_compile_chunks(module, native[i:i + RE2_SET_CHUNK]))
+    return Re2Set(chunks) if chunks else None
@@ -0,0 +1,158 @@
+import re
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Pattern, Tuple
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse
+
+from rules.regex_backend import Re2Pattern, backend_log, get_regex_backend, native_pattern, pattern_set
+from rules.regex_safety import guard
+
+
+# 进程级编译缓存：同一进程内多文件/多次运行共享，不受 re 模块 512 条缓存上限影响；按 (后端, 正则) 区分
+_compiled: Dict[Tuple[str, str], Optional[Pattern]] = {}
+
+_MAXREPEAT = sre_parse.MAXREPEAT
+
+
+def compile_pattern(rx: str) -> Optional[Pattern]:
+    """编译并缓存正则；空串或不可编译时返回 None，有回溯风险的正则包装为限时匹配（rules.regex_safety.guard），
+    当前后端为 re2 且可改写时再包装为 RE2 执行（rules.regex_backend.native_pattern）。"""
+    key = (get_regex_backend(), rx)
+    if key in _compiled:
+        return _compiled[key]
+    pat = None
+    if rx:
+        try:
+            pat = native_pattern(guard(re.compile(rx)))
+        except Exception:
+            pat = None
+    _compiled[key] = pat
+    return pat
+
+
+def check_patterns(patterns: Iterable[str]) -> Dict[str, Any]:
+    """启动检查：按当前后端编译每条正则，统计原生执行的条数（其中只对 ASCII 取值原生执行的条数）
+    与回退到 re 的正则及原因。"""
+    native, ascii_only = 0, 0
+    fallback: Dict[str, str] = {}
+    for rx in sorted({p for p in patterns if isinstance(p, str) and p}):
+        pat = compile_pattern(rx)
+        if pat is None:
+            continue
+        if isinstance(pat, Re2Pattern):
+            native += 1
+            ascii_only += pat.ascii_only
+        else:
+            fallback[rx] = backend_log.fallback.get(rx, "")
+    return {"backend": get_regex_backend(), "native": native, "ascii_only": ascii_only, "fallback": fallback}
+
+
+def _length_bounds(pat: Pattern) -> Tuple[int, Optional[int]]:
+    """返回可能命中的文本长度范围 [min, max]；max 为 None 表示不限。
+
+    最短长度取正则的最小匹配宽度；仅在首尾锚定（^...$，非多行）时才限制最长长度，
+    且为 $ 可匹配结尾换行前的位置预留 1 个字符。
+    """
+    try:
+        parsed = sre_parse.parse(pat.pattern, pat.flags)
+        lo, hi = parsed.getwidth()
+    except Exception:
+        return 0, None
+    if pat.flags & re.MULTILINE or hi >= _MAXREPEAT:
+        return lo, None
+    items = list(parsed)
+    if len(items) < 2:
+        return lo, None
+    head, tail = items[0], items[-1]
+    anchored = (
+        head[0] == sre_parse.AT and head[1] in (sre_parse.AT_BEGINNING, sre_parse.AT_BEGINNING_STRING)
+        and tail[0] == sre_parse.AT and tail[1] in (sre_parse.AT_END, sre_parse.AT_END_STRING)
+    )
+    return lo, (hi + 1 if anchored else None)
+
+
+class RegexIndex:
+    """一组正则的预编译索引：合并为一条交替式做整体预判（re2 后端下为 RE2 集合），按长度预过滤，
+    一次调用返回文本命中的全部正则。"""
+
+    def __init__(self, patterns: Iterable[str]):
+        # 按取值形态（rules.datatype.TypeProfile）收窄后的子索引，按需构建
+        self._restricted: Dict[Any, "RegexIndex"] = {}
+        self.patterns: List[str] = []
+        self._entries: List[Tuple[str, Pattern, int, Optional[int]]] = []
+        for rx in sorted({p for p in patterns if isinstance(p, str)}):
+            pat = compile_pattern(rx)
+            if pat is None:
+                continue
+            lo, hi = _length_bounds(pat)
+            self.patterns.append(rx)
+            self._entries.append((rx, pat, lo, hi))
+        # 按最短长度升序，扫描时遇到 lo > len(text) 即可提前结束
+        self._entries.sort(key=lambda e: e[2])
+
+        # 后端为 re2 时，原生执行的正则合并为一个 RE2 集合，一次扫描得到全部命中
+        self._combined: Optional[Pattern] = None
+        self._set = pattern_set(self._entries)
+        if self._set is not None:
+            native = {id(e) for e in self._set.entries}
+            self._rest = [e for e in self._entries if id(e) not in native]
+            return
+
+        # 无分组、无内联标志的正则可安全拼成一条交替式：整体不命中时其余逐条检查可全部跳过；
+        # 受保护的正则不并入，以免交替式整体失去限时
+        simple = [e for e in self._entries if self._mergeable(e[1])]
+        if len(simple) > 1:
+            self._combined = compile_pattern("|".join(f"(?:{e[0]})" for e in simple))
+        if self._combined is not None:
+            self._rest = [e for e in self._entries if not self._mergeable(e[1])]
+        else:
+            self._rest = self._entries
+
+    @staticmethod
+    def _mergeable(pat) -> bool:
+        return isinstance(pat, re.Pattern) and pat.groups == 0 and pat.flags == re.UNICODE
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def restrict(self, profile) -> "RegexIndex":
+        """只含在该取值形态上可能命中的正则的子索引；仅对符合该形态的文本与原索引结果一致。"""
+        sub = self._restricted.get(profile)
+        if sub is None:
+            kept = [rx for rx, pat, _lo, _hi in self._entries if profile.allows(pat)]
+            # 没有可排除的正则时直接复用原索引
+            sub = self if len(kept) == len(self._entries) else RegexIndex(kept)
+            self._restricted[profile] = sub
+        return sub
+
+    def find(self, text: str) -> FrozenSet[str]:
+        """返回在 text 上 re.search 成功的全部正则原文。"""
+        text = text or ""
+        if self._set is not None:
+            got = self._set.find(text)
+            if got is not None:
+                # 集合外的正则与本文本上须用 re 检查的原生正则合在一起不再有序，不能提前结束
+                found, pending = got
+                return frozenset(found + self._scan(text, self._rest + pending, ordered=False))
+            return frozenset(self._scan(text, self._entries))
+        entries = self._entries
+        if self._combined is not None and self._combined.search(text) is None:
+            entries = self._rest
+        return frozenset(self._scan(text, entries))
+
+    @staticmethod
+    def _scan(text: str, entries, ordered: bool = True) -> List[str]:
+        n = len(text)
+        found = []
+        for rx, pat, lo, hi in entries:
+            if lo > n:
+                if ordered:
+                    break
+                continue
+            if hi is not None and n > hi:
+                continue
+            if pat.search(text) is not None:
+                found.append(rx)
+        return found
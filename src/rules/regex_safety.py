@@ -0,0 +1,356 @@
+import re
+import signal
+import threading
+from typing import Dict, List, Optional, Pattern, Tuple
+
+try:
+    from re import _compiler as sre_compile, _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_compile
+    import sre_parse
+
+
+# 受保护正则单次匹配的默认时间上限（秒）；0 为不限
+DEFAULT_MATCH_TIMEOUT = 0.1
+
+_MAXREPEAT = sre_parse.MAXREPEAT
+_REPEATS = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+_CHAR_OPS = (sre_parse.LITERAL, sre_parse.NOT_LITERAL, sre_parse.IN, sre_parse.ANY)
+
+# 判断两个单字符项是否可能匹配同一字符时使用的探测字符：ASCII 全集加常见中文与全角字符
+_PROBE = "".join(chr(i) for i in range(128)) + "中文一龥年月日　，。：（）"
+
+# 单字符正则无法判断的项视为可匹配任意字符
+_ANY = "any"
+
+# 外层可重复、内层为单原子 + 或 * 的嵌套写法：(X+)+、(?:X*)* 等，可等价改写为单层重复
+_ATOM = r"(?:\\.|\[(?:\\.|[^\]\\])+\]|[^()\[\]\\|*+?{}^$])"
+_COLLAPSIBLE = re.compile(r"\((?:\?:)?(" + _ATOM + r")([+*])\)([+*])")
+_BACKREF = re.compile(r"\\[1-9]|\(\?P=")
+
+
+class MatchTimeout(Exception):
+    pass
+
+
+def _char_sets(state, items, flags) -> List:
+    """一组单字符项各自编译为单字符正则；无法编译的项记为任意字符。"""
+    out = []
+    for item in items:
+        if item == _ANY:
+            out.append(_ANY)
+            continue
+        try:
+            out.append(sre_compile.compile(sre_parse.SubPattern(state, [item]), flags))
+        except Exception:
+            out.append(_ANY)
+    return out
+
+
+def _overlap(state, a: List, b: List, flags: int) -> bool:
+    ca, cb = _char_sets(state, a, flags), _char_sets(state, b, flags)
+    if not ca or not cb:
+        return False
+    if _ANY in ca or _ANY in cb:
+        return True
+    for ch in _PROBE:
+        if any(p.fullmatch(ch) for p in ca) and any(p.fullmatch(ch) for p in cb):
+            return True
+    return False
+
+
+def _nullable(item) -> bool:
+    try:
+        return sre_parse.SubPattern(None, [item]).getwidth()[0] == 0
+    except Exception:
+        return False
+
+
+def _first(seq) -> List:
+    """序列可能匹配的第一个字符对应的单字符项。"""
+    out = []
+    for item in seq:
+        op, av = item
+        if op in _CHAR_OPS:
+            out.append(item)
+        elif op in _REPEATS:
+            out.extend(_first(list(av[2])))
+        elif op is sre_parse.SUBPATTERN:
+            out.extend(_first(list(av[3])))
+        elif op is sre_parse.BRANCH:
+            for alt in av[1]:
+                out.extend(_first(list(alt)))
+        elif op is sre_parse.AT:
+            continue
+        else:
+            out.append(_ANY)
+        if not _nullable(item):
+            break
+    return out
+
+
+def _chars(seq) -> List:
+    """序列中出现的全部单字符项。"""
+    out = []
+    for item in seq:
+        op, av = item
+        if op in _CHAR_OPS:
+            out.append(item)
+        elif op in _REPEATS:
+            out.extend(_chars(list(av[2])))
+        elif op is sre_parse.SUBPATTERN:
+            out.extend(_chars(list(av[3])))
+        elif op is sre_parse.BRANCH:
+            for alt in av[1]:
+                out.extend(_chars(list(alt)))
+        elif op is not sre_parse.AT:
+            out.append(_ANY)
+    return out
+
+
+def _tail_repeats(seq) -> List:
+    """序列末尾（其后只剩可为空的项）的变长重复：重复体可在下一轮迭代开始前多吃或少吃字符。"""
+    out = []
+    for item in reversed(seq):
+        op, av = item
+        if op in _REPEATS and av[1] != av[0]:
+            out.append(item)
+        elif op in _REPEATS:
+            out.extend(_tail_repeats(list(av[2])))
+        elif op is sre_parse.SUBPATTERN:
+            out.extend(_tail_repeats(list(av[3])))
+        elif op is sre_parse.BRANCH:
+            for alt in av[1]:
+                out.extend(_tail_repeats(list(alt)))
+        if not _nullable(item):
+            break
+    return out
+
+
+def _last(seq) -> List:
+    """序列可能匹配的最后一个字符对应的单字符项。"""
+    out = []
+    for item in reversed(seq):
+        op, av = item
+        if op in _CHAR_OPS:
+            out.append(item)
+        elif op in _REPEATS:
+            out.extend(_last(list(av[2])))
+        elif op is sre_parse.SUBPATTERN:
+            out.extend(_last(list(av[3])))
+        elif op is sre_parse.BRANCH:
+            for alt in av[1]:
+                out.extend(_last(list(alt)))
+        elif op is sre_parse.AT:
+            continue
+        else:
+            out.append(_ANY)
+        if not _nullable(item):
+            break
+    return out
+
+
+def _head_repeats(seq) -> List:
+    """序列开头（其前只有可为空的项）的变长重复：可吃进上一轮迭代末尾的字符。"""
+    out = []
+    for item in seq:
+        op, av = item
+        if op in _REPEATS and av[1] != av[0]:
+            out.append(item)
+        elif op in _REPEATS:
+            out.extend(_head_repeats(list(av[2])))
+        elif op is sre_parse.SUBPATTERN:
+            out.extend(_head_repeats(list(av[3])))
+        elif op is sre_parse.BRANCH:
+            for alt in av[1]:
+                out.extend(_head_repeats(list(alt)))
+        if not _nullable(item):
+            break
+    return out
+
+
+def _walk(seq, state, flags: int, risks: List[str]):
+    for op, av in seq:
+        if op in _REPEATS:
+            lo, hi, body = av
+            body = list(body)
+            if hi == _MAXREPEAT or hi > 1:
+                # 末尾的变长重复能吃进下一轮迭代的开头，或开头的变长重复能吃进上一轮迭代的末尾：
+                # 同一段文本有指数（或高次多项式）种切分
+                first, last = _first(body), _last(body)
+                inner_tail = [r for r in _tail_repeats(body) if _overlap(state, _chars(list(r[1][2])), first, flags)]
+                inner_head = [r for r in _head_repeats(body) if _overlap(state, _chars(list(r[1][2])), last, flags)]
+                if inner_tail or inner_head:
+                    risks.append("nested quantifier")
+                if any(_ambiguous_branch(alts, state, flags) for alts in _branches(body)) or _factored_branch(
+                    body, first, state, flags
+                ):
+                    risks.append("ambiguous alternation")
+            _walk(body, state, flags, risks)
+        elif op is sre_parse.SUBPATTERN:
+            _walk(list(av[3]), state, flags, risks)
+        elif op is sre_parse.BRANCH:
+            for alt in av[1]:
+                _walk(list(alt), state, flags, risks)
+
+
+def _branches(seq) -> List:
+    """重复体内（含分组内、不含更深一层重复）的各分支的候选列表。"""
+    out = []
+    for op, av in seq:
+        if op is sre_parse.BRANCH:
+            out.append(av[1])
+            for alt in av[1]:
+                out.extend(_branches(list(alt)))
+        elif op is sre_parse.SUBPATTERN:
+            out.extend(_branches(list(av[3])))
+    return out
+
+
+def _factored_branch(seq, follow: List, state, flags: int) -> bool:
+    """解析时提出公共前缀后的分支：(a|aa)、(ab|a)、(foo|foobar) 变为 a(?:|a)、a(?:b|)、foo(?:|bar)。
+    含空候选的分支之后（follow 为重复体之后、即下一轮迭代的开头）可匹配提出的前缀或非空候选的开头时，
+    同一段文本可由“短候选 + 下一轮”或“长候选”两种方式匹配。"""
+    for i, (op, av) in enumerate(seq):
+        rest = seq[i + 1:]
+        after = _first(rest)
+        if all(_nullable(item) for item in rest):
+            after = after + follow
+        if op is sre_parse.SUBPATTERN:
+            if _factored_branch(list(av[3]), after, state, flags):
+                return True
+        elif op is sre_parse.BRANCH:
+            alts = [list(alt) for alt in av[1]]
+            if any(_factored_branch(alt, after, state, flags) for alt in alts):
+                return True
+            if not any(sre_parse.SubPattern(state, alt).getwidth()[0] == 0 for alt in alts):
+                continue
+            starts = _first(seq[:i]) + [c for alt in alts for c in _first(alt)]
+            if _overlap(state, starts, after, flags):
+                return True
+    return False
+
+
+def _ambiguous_branch(alts, state, flags: int) -> bool:
+    # 解析时公共前缀会被提出，(a|a) 变为 a(?:|)：两个候选都可为空同样是歧义
+    if sum(1 for alt in alts if sre_parse.SubPattern(state, list(alt)).getwidth()[0] == 0) > 1:
+        return True
+    firsts = [_first(list(alt)) for alt in alts]
+    for i in range(len(firsts)):
+        for j in range(i + 1, len(firsts)):
+            if _overlap(state, firsts[i], firsts[j], flags):
+                return True
+    return False
+
+
+def regex_risks(rx: str) -> List[str]:
+    """灾难性回溯风险：重复体内的变长重复可与相邻迭代争抢字符（嵌套量词，如 (a+)+、(\\w+\\s?)*、(.*a){12}），
+    或重复体内的分支开头可匹配同一字符（歧义分支，如 (a|a)*、(\\w|\\d\\d)+、(a|aa)+、(foo|foobar)+；
+    单字符分支会被解析为字符集，不算歧义）。启发式判断，无风险时返回空列表。"""
+    try:
+        parsed = sre_parse.parse(rx)
+    except Exception:
+        return []
+    risks: List[str] = []
+    _walk(list(parsed), parsed.state, parsed.state.flags, risks)
+    return sorted(set(risks))
+
+
+def rewrite_regex(rx: str) -> str:
+    """把 (X+)+、(X*)*、(X+)*、(X*)+ 改写为等价的单层重复 X+ / X*（分组仅用于重复，规则不读取分组）。
+    含反向引用（去掉分组会改变编号）或改写后无法编译时原样返回。"""
+    if _BACKREF.search(rx):
+        return rx
+    out, prev = rx, None
+    while prev != out:
+        prev = out
+        out = _COLLAPSIBLE.sub(lambda m: m.group(1) + ("+" if m.group(2) == m.group(3) == "+" else "*"), out)
+    if out == rx:
+        return rx
+    try:
+        re.compile(out)
+    except re.error:
+        return rx
+    return out
+
+
+class TimeoutLog:
+    """进程内受保护正则的统计：受保护的正则、各正则超时次数。多进程时由工作进程按块取出后合并。"""
+
+    def __init__(self):
+        self.guarded: Dict[str, List[str]] = {}
+        self.timeouts: Dict[str, int] = {}
+
+    def drain(self) -> Tuple[Dict[str, List[str]], Dict[str, int]]:
+        """取出受保护的正则与自上次取出以来的超时次数（超时计数清零）。"""
+        out, self.timeouts = self.timeouts, {}
+        return dict(self.guarded), out
+
+    def merge(self, guarded: Dict[str, List[str]], timeouts: Dict[str, int]):
+        self.guarded.update(guarded)
+        for rx, n in timeouts.items():
+            self.timeouts[rx] = self.timeouts.get(rx, 0) + n
+
+
+timeout_log = TimeoutLog()
+
+_settings = {"timeout": DEFAULT_MATCH_TIMEOUT}
+
+
+def set_match_timeout(seconds: float):
+    _settings["timeout"] = max(0.0, float(seconds))
+
+
+def get_match_timeout() -> float:
+    return _settings["timeout"]
+
+
+def _on_alarm(signum, frame):
+    raise MatchTimeout()
+
+
+class GuardedPattern:
+    """有回溯风险的正则：匹配时以 SIGALRM 计时，超过时间上限视为未命中并计入 timeout_log。
+
+    只在主线程、且平台支持 SIGALRM 时计时（CLI、多进程工作进程与 HTTP 服务均在主线程求值），否则直接匹配。
+    """
+
+    def __init__(self, pat: Pattern, risks: List[str]):
+        self.pat = pat
+        self.pattern = pat.pattern
+        self.flags = pat.flags
+        self.groups = pat.groups
+        self.risks = risks
+
+    def search(self, text: str, *args):
+        timeout = _settings["timeout"]
+        if timeout <= 0 or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+            return self.pat.search(text, *args)
+        found = None
+        old = signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            found = self.pat.search(text, *args)
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        except MatchTimeout:
+            # 计时器可能恰在匹配完成后触发，此时仍返回已得到的结果
+            if found is None:
+                timeout_log.timeouts[self.pattern] = timeout_log.timeouts.get(self.pattern, 0) + 1
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, old)
+        return found
+
+    def fullmatch(self, text: str, *args):
+        return self.pat.fullmatch(text, *args)
+
+
+def guard(pat: Optional[Pattern]):
+    """有回溯风险的正则包装为 GuardedPattern，其余原样返回。"""
+    if pat is None:
+        return None
+    risks = regex_risks(pat.pattern)
+    if not risks:
+        return pat
+    timeout_log.guarded[pat.pattern] = risks
+    return GuardedPattern(pat, risks)
@@ -0,0 +1,107 @@
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+# 单条 SQL 中 IN (...) 的参数个数上限，兼容旧版 SQLite 的 999 变量限制
+_QUERY_CHUNK = 500
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS results ("
+    " domain TEXT NOT NULL, ruleset TEXT NOT NULL, fp TEXT NOT NULL,"
+    " result TEXT NOT NULL, used REAL NOT NULL)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS results_key ON results (domain, ruleset, fp)",
+    "CREATE INDEX IF NOT EXISTS results_used ON results (used)",
+)
+
+
+class ResultCache:
+    """跨运行的持久结果缓存（SQLite）：键为 (领域, 规则集哈希, 行指纹)，值为结果摘要。
+
+    多个 layer4 进程可同时读写同一文件（WAL 模式 + 忙等待）；条目数超过 max_entries 时
+    在关闭时按最近使用时间淘汰最旧的条目。规则集变化后旧哈希下的条目不再命中，随淘汰回收。
+    """
+
+    def __init__(self, path: str, domain: str, digest: str, max_entries: int = 1000000):
+        self.path = path
+        self.domain = domain
+        self.digest = digest
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            for stmt in _SCHEMA:
+                self.conn.execute(stmt)
+
+    def get_many(self, fps: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        keys = list(dict.fromkeys(fps))
+        found: Dict[str, Dict[str, Any]] = {}
+        for i in range(0, len(keys), _QUERY_CHUNK):
+            chunk = keys[i:i + _QUERY_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            cur = self.conn.execute(
+                f"SELECT fp, result FROM results WHERE domain = ? AND ruleset = ? AND fp IN ({marks})",
+                [self.domain, self.digest, *chunk],
+            )
+            for fp, result in cur:
+                found[fp] = json.loads(result)
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        if found:
+            now = time.time()
+            with self.conn:
+                self.conn.executemany(
+                    "UPDATE results SET used = ? WHERE domain = ? AND ruleset = ? AND fp = ?",
+                    [(now, self.domain, self.digest, fp) for fp in found],
+                )
+        return found
+
+    def put_many(self, items: List[Tuple[str, Dict[str, Any]]]):
+        if not items:
+            return
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO results (domain, ruleset, fp, result, used) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (self.domain, self.digest, fp, json.dumps(p, ensure_ascii=False, default=str), now)
+                    for fp, p in items
+                ],
+            )
+        self.writes += len(items)
+
+    def evict(self) -> int:
+        if self.max_entries <= 0:
+            return 0
+        with self.conn:
+            count = self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            excess = count - self.max_entries
+            if excess <= 0:
+                return 0
+            self.conn.execute(
+                "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY used LIMIT ?)",
+                (excess,),
+            )
+        return excess
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "hit_ratio": (self.hits / total) if total > 0 else 0.0,
+        }
+
+    def close(self) -> int:
+        evicted = self.evict()
+        self.conn.close()
+        return evicted
@@ -0,0 +1,138 @@
+import math
+from collections import Counter
+from typing import Any, Dict, FrozenSet, List, Tuple
+
+from rules.engine import CompiledRules, _Row
+
+
+# 列画像中按样本值统计的变量
+VALUE_VARIABLE = "value_text"
+
+# 99% 置信水平的正态分位数
+Z_99 = 2.576
+
+# 判定前至少采样的非空值个数，避免少量样本偶然全中或全不中
+MIN_SAMPLE = 100
+
+
+def wilson_interval(k: int, n: int, z: float = Z_99) -> Tuple[float, float]:
+    """二项比例 k/n 的 Wilson 置信区间；n 为 0 时返回 (0, 1)。"""
+    if n <= 0:
+        return 0.0, 1.0
+    p = k / n
+    z2 = z * z
+    denom = 1 + z2 / n
+    center = (p + z2 / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z2 / (4 * n * n)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+class ColumnSample:
+    """单列的采样统计：读取行数、非空值个数、空值个数、各样本值关键词/正则的命中次数与样本值频次。"""
+
+    __slots__ = ("name", "rows", "values", "nulls", "hits", "top", "done", "early")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.rows = 0
+        self.values = 0
+        self.nulls = 0
+        self.hits: Counter = Counter()
+        self.top: Counter = Counter()
+        self.done = False
+        # 在达到采样上限之前即已在统计上判定
+        self.early = False
+
+
+class ColumnSampler:
+    """数据表列画像：按列流式采样真实数据值，对样本值上的关键词/正则（value_text 上的 contains /
+    matches_regex）逐块统计命中率，再以列名与采样结果执行规则，给出每列的分类、分级与匹配率。
+
+    每块内相同的值只匹配一次，所有关键词/正则按变量汇总的匹配器一次扫描得到。某个关键词/正则在样本中的
+    命中率达到 threshold 即视为该列命中；每块结束后按 Wilson 置信区间检查，所有关键词/正则的命中率都已
+    明确高于或低于 threshold 时停止该列的采样，否则最多采样 sample_size 个非空值或读取 sample_rows 行。
+    """
+
+    def __init__(
+        self,
+        engine: CompiledRules,
+        threshold: float = 0.8,
+        sample_size: int = 5000,
+        sample_rows: int = 100000,
+    ):
+        self.engine = engine
+        self.threshold = threshold
+        self.sample_size = sample_size
+        self.sample_rows = sample_rows
+        self.value_keys = [key for key in engine.matchers if key[1] == VALUE_VARIABLE]
+
+    def add(self, col: ColumnSample, values: List[Any]):
+        counts: Counter = Counter()
+        for v in values:
+            s = "" if v is None else str(v)
+            if s.strip():
+                counts[s] += 1
+            else:
+                col.nulls += 1
+        col.rows += len(values)
+        col.values += sum(counts.values())
+        matchers = self.engine.matchers
+        for s, c in counts.items():
+            for key in self.value_keys:
+                for pat in matchers[key].find(s):
+                    col.hits[(key, pat)] += c
+        col.top.update(counts)
+        if self._decided(col):
+            col.early = True
+            col.done = True
+        elif col.values >= self.sample_size or col.rows >= self.sample_rows:
+            col.done = True
+
+    def add_rows(self, columns: List[ColumnSample], rows: List[List[Any]]) -> bool:
+        """按列累计一块行数据，已判定的列跳过；返回是否所有列都已停止采样。"""
+        for i, col in enumerate(columns):
+            if not col.done:
+                self.add(col, [r[i] if i < len(r) else None for r in rows])
+        return all(col.done for col in columns)
+
+    def _decided(self, col: ColumnSample) -> bool:
+        n = col.values
+        if n < MIN_SAMPLE:
+            return False
+        t = self.threshold
+        # 尚未命中过的关键词/正则共用 k=0 的区间
+        if self.value_keys and wilson_interval(0, n)[1] >= t:
+            return False
+        for k in col.hits.values():
+            lo, hi = wilson_interval(k, n)
+            if lo < t <= hi:
+                return False
+        return True
+
+    def accepted(self, col: ColumnSample) -> Dict[Tuple[str, str], FrozenSet[str]]:
+        """命中率达到阈值的关键词/正则，按 (算子, 变量名) 分组。"""
+        found: Dict[Tuple[str, str], set] = {key: set() for key in self.value_keys}
+        n = col.values
+        for (key, pat), k in col.hits.items():
+            if n and k / n >= self.threshold:
+                found[key].add(pat)
+        return {key: frozenset(pats) for key, pats in found.items()}
+
+    def match_ratio(self, col: ColumnSample) -> float:
+        """样本值上命中率最高的关键词/正则的命中率。"""
+        if not col.values or not col.hits:
+            return 0.0
+        return max(col.hits.values()) / col.values
+
+    def sample_value(self, col: ColumnSample) -> str:
+        """出现最多的样本值，供非关键词/正则的样本值条件使用。"""
+        top = col.top.most_common(1)
+        return top[0][0] if top else ""
+
+    def classify(self, col: ColumnSample, obj: Dict[str, Any]) -> Dict[str, Any]:
+        """obj 为以列名构造的规则输入；样本值上的关键词/正则以采样判定结果代替单值扫描。"""
+        row = _Row(obj, self.engine.matchers)
+        row.found_kw.update(self.accepted(col))
+        self.engine._run_score(row)
+        self.engine._run_decision(row)
+        return obj
@@ -0,0 +1,92 @@
+import csv
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from rules.bundle import RULES_JSON, load_bundle
+from rules.engine import is_valid_rule
+
+
+# 影子对比的两套规则在多规则集执行器中的名称
+CURRENT = "current"
+CANDIDATE = "candidate"
+
+# 判定行结果变化时比较的字段
+DIFF_FIELDS = ("category", "level", "confidence")
+
+ROW_COLUMNS = [
+    "row", "table_name", "field_name", "field_comment", "changed",
+    "current_category", "candidate_category", "current_level", "candidate_level",
+    "current_confidence", "candidate_confidence", "current_rule_id", "candidate_rule_id",
+]
+
+
+def load_candidate(path: str) -> List[Dict]:
+    """读取候选规则集：unified_rules.json 文件，或含规则包/JSON 的规则目录；返回有效规则。"""
+    if os.path.isdir(path):
+        bundle = load_bundle(path)
+        if bundle is not None:
+            return bundle["rules"]
+        path = os.path.join(path, RULES_JSON)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"candidate rules not found: {path}")
+    with open(path, "r", encoding="utf-8") as f:
+        rules: List[Dict] = json.load(f)
+    return [r for r in rules if is_valid_rule(r)]
+
+
+class ShadowDiff:
+    """汇总现行/候选两套规则的逐行差异：记录分类、分级或置信度变化的行，并按规则ID统计变化次数。"""
+
+    def __init__(self):
+        self.rows = 0
+        self.changed_rows: List[Dict[str, Any]] = []
+        self.field_counts = {f: 0 for f in DIFF_FIELDS}
+        self.rule_counts: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, rid: str, side: str, changed: List[str]):
+        c = self.rule_counts.setdefault(rid or "", {"as_current": 0, "as_candidate": 0, **{f: 0 for f in DIFF_FIELDS}})
+        c[side] += 1
+        for f in changed:
+            c[f] += 1
+
+    def add(self, index: int, info: Dict[str, Any], current: Dict[str, Any], candidate: Dict[str, Any]) -> Optional[Dict]:
+        """current/candidate 为同一行在两套规则下的结果（category/level/rule_id/confidence）。"""
+        self.rows += 1
+        changed = [f for f in DIFF_FIELDS if current.get(f) != candidate.get(f)]
+        if not changed:
+            return None
+        for f in changed:
+            self.field_counts[f] += 1
+        # 变化同时计入现行与候选结果的规则ID；两侧规则ID相同时只计一次
+        self._count(current.get("rule_id", ""), "as_current", changed)
+        if candidate.get("rule_id", "") != current.get("rule_id", ""):
+            self._count(candidate.get("rule_id", ""), "as_candidate", changed)
+        rec = {"row": index, **info, "changed": ",".join(changed)}
+        for f in ("category", "level", "confidence", "rule_id"):
+            rec[f"current_{f}"] = current.get(f, "")
+            rec[f"candidate_{f}"] = candidate.get(f, "")
+        self.changed_rows.append(rec)
+        return rec
+
+    def report(self) -> Dict[str, Any]:
+        rules = [{"rule_id": rid, **c} for rid, c in self.rule_counts.items()]
+        rules.sort(key=lambda r: (-(r["as_current"] + r["as_candidate"]), r["rule_id"]))
+        return {
+            "summary": {"rows": self.rows, "changed": len(self.changed_rows), **self.field_counts},
+            "rules": rules,
+            "rows": self.changed_rows,
+        }
+
+    def write_report(self, base_path: str):
+        """写出 <base>.shadow.json（汇总 + 按规则ID统计 + 变化行）与 <base>.shadow.csv（变化行）。"""
+        rep = self.report()
+        json_path = base_path + ".shadow.json"
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(rep, f, ensure_ascii=False, indent=2)
+        csv_path = base_path + ".shadow.csv"
+        with open(csv_path, "w", encoding="utf-8-sig", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=ROW_COLUMNS)
+            w.writeheader()
+            w.writerows(rep["rows"])
+        return json_path, csv_path
@@ -1,10 +1,33 @@
 from business_rules.variables import BaseVariables, string_rule_variable, numeric_rule_variable
 
 
+# 按数据项累计的分数变量：条件名写作 item_score:<数据项标签>
+ITEM_SCORE_PREFIX = "item_score:"
+
+
+def item_score(obj, item: str) -> float:
+    try:
+        return float((obj.get("item_scores") or {}).get(item, 0) or 0)
+    except Exception:
+        return 0.0
+
+
 class ClassificationVariables(BaseVariables):
     def __init__(self, obj):
         self.obj = obj
 
+    def __getattr__(self, name):
+        # business_rules 的变量不带参数，数据项由变量名携带
+        if name.startswith(ITEM_SCORE_PREFIX):
+            item = name[len(ITEM_SCORE_PREFIX):]
+
+            @numeric_rule_variable()
+            def _item_score():
+                return item_score(self.obj, item)
+
+            return _item_score
+        raise AttributeError(name)
+
     @string_rule_variable()
     def field_name(self):
         return str(self.obj.get("field_name", ""))
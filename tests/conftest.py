@@ -0,0 +1,86 @@
+import os
+import random
+import sys
+
+import pytest
+
+# 与 src/ 下各模块一致：以 src 为导入根（from rules.engine import ...）
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+import layer4_classifier as l4
+from layer3_business_rules_builder import build_unified_rules
+from rules.engine import is_valid_rule
+from rules.regex_safety import get_match_timeout, set_match_timeout, timeout_log
+
+
+# 合成规则来源（layer3 合并后的行格式）：关键词、正则、可改写的嵌套量词与有回溯风险的分支
+SYNTHETIC_SOURCE = [
+    {"FieldName": "手机号码", "Category": "个人信息/联系方式", "Level": "s3",
+     "PatternKeywords": "mobile,phone,手机", "PatternRegex": r"^1[3-9]\d{9}$"},
+    {"FieldName": "身份证号", "Category": "个人信息/身份标识", "Level": "s4",
+     "PatternKeywords": "idcard,id,身份证", "PatternRegex": r"^\d{17}[\dXx]$"},
+    {"FieldName": "电子邮箱", "Category": "个人信息/联系方式", "Level": "s2",
+     "PatternKeywords": "email,mail,邮箱", "PatternRegex": r"^[\w.+-]+@[\w-]+(\.[\w-]+)*\.[a-z]{2,}$"},
+    {"FieldName": "姓名", "Category": "个人信息/基本信息", "Level": "s2",
+     "PatternKeywords": "name,姓名", "PatternRegex": ""},
+    {"FieldName": "账号", "Category": "账户信息", "Level": "s3",
+     "PatternKeywords": "account,acct,账号", "PatternRegex": r"^(\d+)+$||^(a|aa)+$"},
+]
+
+SYNTHETIC_FIELDS = [
+    ("mobile_no", "手机号码"), ("user_phone", "联系电话"), ("id_card", "身份证号"), ("email", "邮箱地址"),
+    ("cust_name", "客户姓名"), ("acct_id", "账号"), ("remark", "备注"), ("status", ""), ("", "手机"),
+]
+
+SYNTHETIC_VALUES = [
+    "13812345678", "110101199003071234", "a@b.com", "张三", "6222020200112233", "", "abc",
+    "a" * 40 + "!", "aaaa", "2020-01-01",
+]
+
+SYNTHETIC_HEADERS = ["表名", "字段名", "字段注释", "字段样本"]
+
+
+@pytest.fixture(scope="session")
+def synthetic_rules():
+    return [r for r in build_unified_rules(SYNTHETIC_SOURCE) if is_valid_rule(r)]
+
+
+@pytest.fixture(scope="session")
+def synthetic_rows():
+    rnd = random.Random(7)
+    rows = [["t_user", en, cn, v] for en, cn in SYNTHETIC_FIELDS for v in SYNTHETIC_VALUES]
+    for _ in range(200):
+        en, cn = rnd.choice(SYNTHETIC_FIELDS)
+        rows.append([rnd.choice(["t_user", "cust_info", "order"]), en, cn, rnd.choice(SYNTHETIC_VALUES)])
+    return rows
+
+
+@pytest.fixture(scope="session")
+def synthetic_columns():
+    return l4.detect_columns(SYNTHETIC_HEADERS)
+
+
+def summaries(results):
+    """去掉原始行后的结果摘要，便于比较不同执行方式的输出。"""
+    return [{k: v for k, v in p.items() if k != "row"} for p in results]
+
+
+@pytest.fixture
+def classify_serial(synthetic_columns):
+    """按指定引擎单进程分类合成行，返回结果摘要列表。"""
+    def run(rules, rows, engine="compiled"):
+        classify = l4.serial_classifier(l4.make_engine(rules, engine, cache_size=0))
+        return summaries(classify(rows, synthetic_columns, "sheet"))
+    return run
+
+
+@pytest.fixture(scope="session")
+def synthetic_expected(synthetic_rules, synthetic_rows, synthetic_columns):
+    """逐行解释执行（business_rules.run_all）的结果，作为各执行方式的对照。"""
+    saved = get_match_timeout()
+    set_match_timeout(0.05)
+    try:
+        classify = l4.serial_classifier(l4.make_engine(synthetic_rules, "business_rules", cache_size=0))
+        return summaries(classify(synthetic_rows, synthetic_columns, "sheet"))
+    finally:
+        set_match_timeout(saved)
+        timeout_log.drain()
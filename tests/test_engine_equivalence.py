@@ -0,0 +1,39 @@
+from multiprocessing import Pool
+
+import pytest
+
+import layer4_classifier as l4
+from layer4_classifier import is_matched
+from rules.regex_safety import get_match_timeout, set_match_timeout, timeout_log
+
+
+@pytest.fixture(autouse=True)
+def _timeout():
+    saved = get_match_timeout()
+    set_match_timeout(0.05)
+    yield
+    set_match_timeout(saved)
+    timeout_log.drain()
+
+
+def test_synthetic_rules_cover_rows(synthetic_expected):
+    levels = {p["level"] for p in synthetic_expected}
+    assert {"s2", "s3", "s4"} <= levels
+    assert any(not is_matched(p) for p in synthetic_expected)
+
+
+def test_compiled_matches_interpreted(synthetic_rules, synthetic_rows, synthetic_expected, classify_serial):
+    assert classify_serial(synthetic_rules, synthetic_rows, "compiled") == synthetic_expected
+
+
+def test_columnar_matches_interpreted(synthetic_rules, synthetic_rows, synthetic_expected, classify_serial):
+    assert classify_serial(synthetic_rules, synthetic_rows, "columnar") == synthetic_expected
+
+
+def test_workers_match_interpreted(synthetic_rules, synthetic_rows, synthetic_columns, synthetic_expected, monkeypatch):
+    # 小块分发，保证两个工作进程都参与
+    monkeypatch.setattr(l4, "WORKER_CHUNK_ROWS", 40)
+    initargs = (synthetic_rules, "compiled", 0, None, "", False, get_match_timeout())
+    with Pool(2, initializer=l4._init_worker, initargs=initargs) as pool:
+        results = list(l4.parallel_classifier(pool, 2)(synthetic_rows, synthetic_columns, "sheet"))
+    assert [{k: v for k, v in p.items() if k != "row"} for p in results] == synthetic_expected
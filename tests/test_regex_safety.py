@@ -0,0 +1,94 @@
+import re
+import time
+
+import pytest
+
+from rules.regex_safety import GuardedPattern, guard, regex_risks, rewrite_regex, set_match_timeout, timeout_log
+
+
+# 解析时公共前缀会被提出的歧义分支：a(?:|a)、a(?:b|)、foo(?:|bar) 等
+FACTORED_ALTERNATIONS = [
+    r"^(a|aa)+$",
+    r"^(\d|\d\d)+$",
+    r"^(a|ab)+$",
+    r"^(foo|foobar)+$",
+    r"^(ab|a)*c",
+]
+
+NESTED_QUANTIFIERS = [r"^(a+)+$", r"^(\w+\s?)+$", r"^(\d{1,3})+$", r"(.*a){12}"]
+
+SAFE = [
+    r"^1[3-9]\d{9}$",
+    r"^\d{17}[\dXx]$",
+    r"^\d+(?:-\d+)*$",
+    r"^(\w+\.)+\w+$",
+    r"(\s*,\s*\w+)*",
+    r"^(?:男|女)$",
+    r"^(\+?86)?1\d{10}$",
+    r"^(?:\d{3}-|\d{4}-)?\d{7,8}$",
+    r"^[\w.+-]+@[\w-]+(\.[\w-]+)*\.[a-z]{2,}$",
+]
+
+
+@pytest.fixture(autouse=True)
+def _timeout():
+    set_match_timeout(0.1)
+    timeout_log.drain()
+    yield
+    timeout_log.drain()
+
+
+@pytest.mark.parametrize("rx", FACTORED_ALTERNATIONS)
+def test_factored_alternation_is_flagged(rx):
+    assert "ambiguous alternation" in regex_risks(rx)
+    assert isinstance(guard(re.compile(rx)), GuardedPattern)
+
+
+@pytest.mark.parametrize("rx", NESTED_QUANTIFIERS)
+def test_nested_quantifier_is_flagged(rx):
+    assert "nested quantifier" in regex_risks(rx)
+
+
+@pytest.mark.parametrize("rx", SAFE)
+def test_safe_patterns_are_not_guarded(rx):
+    assert regex_risks(rx) == []
+    assert isinstance(guard(re.compile(rx)), re.Pattern)
+
+
+@pytest.mark.parametrize("rx, text", [
+    (r"^(a|aa)+$", "a" * 60 + "b"),
+    (r"^(\d|\d\d)+$", "1" * 60 + "x"),
+    (r"^(a+)+$", "a" * 40 + "!"),
+    (r"^(\w+\s?)+$", "a" * 40 + "!"),
+])
+def test_guarded_match_times_out(rx, text):
+    pat = guard(re.compile(rx))
+    start = time.perf_counter()
+    assert pat.search(text) is None
+    assert time.perf_counter() - start < 2
+    assert timeout_log.drain()[1] == {rx: 1}
+
+
+def test_guarded_match_keeps_results():
+    pat = guard(re.compile(r"^(a|aa)+$"))
+    assert pat.search("aaaa") is not None
+    assert pat.search("aab") is None
+    assert timeout_log.drain()[1] == {}
+
+
+@pytest.mark.parametrize("rx, expected", [
+    (r"^(a+)+$", r"^a+$"),
+    (r"^(?:[0-9]+)+$", r"^[0-9]+$"),
+    (r"^(\d+)*-$", r"^\d*-$"),
+    (r"^(a+)+\1$", r"^(a+)+\1$"),
+])
+def test_rewrite_collapses_nested_repeats(rx, expected):
+    assert rewrite_regex(rx) == expected
+
+
+@pytest.mark.parametrize("engine", ["business_rules", "compiled", "columnar"])
+def test_engine_times_out_on_redos_sample(synthetic_rules, synthetic_columns, classify_serial, engine):
+    # 账号规则的 ^(a|aa)+$ 在该样本上超时，按未命中处理，其余规则照常求值
+    [p] = classify_serial(synthetic_rules, [["t", "remark", "备注", "a" * 40 + "!"]], engine)
+    assert p["rid"] == "" and p["tags"] == ""
+    assert timeout_log.drain()[1] == {r"^(a|aa)+$": 1}